@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Election, Position, Party, Candidate, Vote, VoterElectionWhitelist, ElectoralRoll
+from django.db import transaction
+from .models import User, Election, Position, Party, Candidate, Vote, VoterElectionWhitelist, ElectoralRoll, VoteTally, ReconciliationRun
+from .tally import record_votes, remove_votes
+from .cache import invalidate_election
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'student_id', 'is_admin',)
@@ -41,10 +44,51 @@ class CandidateAdmin(admin.ModelAdmin):
     search_fields = ('name', 'bio')
 
 class VoteAdmin(admin.ModelAdmin):
-    list_display = ('election', 'position', 'candidate', 'wallet', 'timestamp')
-    list_filter = ('election', 'position')
+    list_display = ('election', 'position', 'candidate', 'wallet', 'timestamp', 'verification_status')
+    list_filter = ('election', 'position', 'verification_status')
     search_fields = ('wallet', 'transaction_hash')
-    readonly_fields = ('timestamp',)
+    readonly_fields = ('timestamp', 'verified_at')
+
+    # Keep the running tallies in step with votes edited here
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if change:
+                previous = Vote.objects.get(pk=obj.pk)
+                remove_votes([previous])
+                invalidate_election(previous.election_id)
+            super().save_model(request, obj, form, change)
+            record_votes([obj])
+            invalidate_election(obj.election_id)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            remove_votes([obj])
+            super().delete_model(request, obj)
+            invalidate_election(obj.election_id)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            votes = list(queryset)
+            remove_votes(votes)
+            super().delete_queryset(request, queryset)
+            for election_id in {vote.election_id for vote in votes}:
+                invalidate_election(election_id)
+
+class VoteTallyAdmin(admin.ModelAdmin):
+    """
+    Admin interface for inspecting the running vote counters
+    """
+    list_display = ('election', 'position', 'candidate', 'votes')
+    list_filter = ('election',)
+    readonly_fields = ('election', 'position', 'candidate', 'votes')
+
+class ReconciliationRunAdmin(admin.ModelAdmin):
+    """
+    Admin interface for inspecting chain reconciliation runs
+    """
+    list_display = ('election', 'from_block', 'to_block', 'differences', 'created_at')
+    list_filter = ('election',)
+    readonly_fields = ('election', 'from_block', 'to_block', 'differences', 'report_path', 'created_at')
 
 class VoterElectionWhitelistAdmin(admin.ModelAdmin):
     """
@@ -71,3 +115,5 @@ admin.site.register(Candidate, CandidateAdmin)
 admin.site.register(Vote, VoteAdmin)
 admin.site.register(VoterElectionWhitelist, VoterElectionWhitelistAdmin)
 admin.site.register(ElectoralRoll, ElectoralRollAdmin)
+admin.site.register(VoteTally, VoteTallyAdmin)
+admin.site.register(ReconciliationRun, ReconciliationRunAdmin)
@@ -0,0 +1,142 @@
+"""
+Helpers shared by the benchmark management commands
+"""
+import random
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import User, Election, Position, Party, Candidate, Vote, VoterElectionWhitelist
+from .tally import rebuild_tallies
+
+
+def wallet_for(index):
+    """
+    Deterministic, well-formed wallet address for a synthetic voter
+    """
+    return f"0x{index:040x}"
+
+
+def seed_election(positions=10, candidates=50, voters=100, title='Benchmark Election', seed=0,
+                  parties=0, whitelisted=0):
+    """
+    Create an election with the given number of positions, candidates and
+    voters. Every voter casts one vote for a random candidate per position.
+    Candidates are spread evenly across positions (and parties, if any), and
+    ``whitelisted`` new users are whitelisted for the election.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    election = Election.objects.create(
+        title=title,
+        description='Synthetic election used for benchmarking',
+        start_time=now,
+        end_time=now + timezone.timedelta(days=1),
+        status='Voting',
+    )
+
+    # position_id and candidate_id are globally unique, so start above the current maximum
+    next_position_id = (Position.objects.aggregate(m=Max('position_id'))['m'] or 0) + 1
+    next_candidate_id = (Candidate.objects.aggregate(m=Max('candidate_id'))['m'] or 0) + 1
+
+    position_objs = Position.objects.bulk_create([
+        Position(election=election, title=f"Position {i:04d}", position_id=next_position_id + i)
+        for i in range(positions)
+    ])
+
+    party_objs = Party.objects.bulk_create([Party(name=f"Party {i:03d}") for i in range(parties)])
+
+    candidate_objs = Candidate.objects.bulk_create([
+        Candidate(
+            name=f"Candidate {i:05d}",
+            election=election,
+            position=position_objs[i % positions],
+            party=party_objs[i % parties] if parties else None,
+            bio='',
+            manifesto='',
+            candidate_id=next_candidate_id + i,
+        )
+        for i in range(candidates)
+    ])
+
+    by_position = {}
+    for candidate in candidate_objs:
+        by_position.setdefault(candidate.position_id, []).append(candidate)
+
+    votes = []
+    for voter in range(voters):
+        wallet = wallet_for(voter)
+        for position in position_objs:
+            choices = by_position.get(position.pk)
+            if not choices:
+                continue
+            votes.append(Vote(
+                election=election,
+                position=position,
+                candidate=rng.choice(choices),
+                wallet=wallet,
+            ))
+    Vote.objects.bulk_create(votes, batch_size=5000)
+    rebuild_tallies(election)
+
+    if whitelisted:
+        users = User.objects.bulk_create([
+            User(username=f"bench-{election.id}-{i}", wallet_address=wallet_for(election.id << 32 | i))
+            for i in range(whitelisted)
+        ], batch_size=1000)
+        VoterElectionWhitelist.objects.bulk_create([
+            VoterElectionWhitelist(voter=user, election=election, is_whitelisted=True)
+            for user in users
+        ], batch_size=1000)
+
+    return election
+
+
+def vote_bodies(election, wallets):
+    """
+    Vote request bodies of a seeded election: each wallet votes once for every
+    position, for candidates taken in turn
+    """
+    by_position = {}
+    for pk, position_id in Candidate.objects.filter(election=election).order_by('pk').values_list('pk', 'position_id'):
+        by_position.setdefault(position_id, []).append(pk)
+
+    bodies = []
+    for wallet in wallets:
+        for position_id, candidates in sorted(by_position.items()):
+            bodies.append({
+                'election': election.id,
+                'position': position_id,
+                'candidate': candidates[len(bodies) % len(candidates)],
+                'wallet': wallet,
+            })
+    return bodies
+
+
+def whitelisted_wallets(election):
+    return list(
+        VoterElectionWhitelist.objects.filter(election=election, is_whitelisted=True)
+        .order_by('id').values_list('voter__wallet_address', flat=True)
+    )
+
+
+@contextmanager
+def measure():
+    """
+    Capture the number of queries and the wall-clock time of a block
+    """
+    stats = {'queries': 0}
+
+    # Counted rather than captured: CaptureQueriesContext keeps at most 9000 queries
+    def count(execute, sql, params, many, context):
+        stats['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        start = time.perf_counter()
+        yield stats
+        stats['seconds'] = time.perf_counter() - start
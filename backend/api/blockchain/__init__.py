@@ -0,0 +1,3 @@
+"""
+Backend access to the Election and ElectionFactory contracts
+"""
@@ -0,0 +1,53 @@
+"""
+Contract ABIs and web3 connections
+"""
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+
+# Election.ElectionPhase enum values, in declaration order
+ELECTION_PHASES = ['Init', 'Voting', 'Closed']
+
+
+@lru_cache(maxsize=None)
+def load_abi(contract_name):
+    """
+    ABI of a contract from its truffle artifact in CONTRACTS_ABI_DIR
+    """
+    with open(settings.CONTRACTS_ABI_DIR / f"{contract_name}.json") as artifact:
+        return json.load(artifact)['abi']
+
+
+def get_web3():
+    return Web3(Web3.HTTPProvider(settings.BLOCKCHAIN_PROVIDER_URL))
+
+
+def election_contract(w3, address):
+    return w3.eth.contract(address=Web3.to_checksum_address(address), abi=load_abi('Election'))
+
+
+def factory_contract(w3, address=None):
+    address = address or settings.ELECTION_FACTORY_ADDRESS
+    return w3.eth.contract(address=Web3.to_checksum_address(address), abi=load_abi('ElectionFactory'))
+
+
+def event_topics(contract_name, event_names):
+    """
+    Map the topic hash of each named event to its name
+    """
+    return {
+        Web3.to_hex(event_abi_to_log_topic(abi)): abi['name']
+        for abi in load_abi(contract_name)
+        if abi['type'] == 'event' and abi['name'] in event_names
+    }
+
+
+def address_variants(address):
+    """
+    Spellings a wallet address may be stored under: lowercase as sent by
+    MetaMask, and EIP-55 checksummed as returned by web3
+    """
+    return {address.lower(), Web3.to_checksum_address(address)}
@@ -0,0 +1,239 @@
+"""
+Indexer ingesting Election contract events into the database
+
+Events of every election with a contract address are pulled with one
+eth_getLogs call per block range, decoded, and upserted in bulk. The last
+indexed block is checkpointed per contract in ChainCheckpoint. Only blocks at
+least `confirmations` deep are indexed, so chain reorganisations shallower
+than that never reach the database. Blocks and logs are read through the
+shared JSON-RPC client (rpc.py) of the web3 provider's endpoint, with its
+retries and timeouts; web3 only decodes the events.
+"""
+import logging
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from web3 import Web3
+
+from ..cache import invalidate_election, invalidate_election_metadata
+from ..models import User, Election, Position, Candidate, Vote, VoterElectionWhitelist, ChainCheckpoint
+from ..tally import record_votes
+from .contracts import ELECTION_PHASES, election_contract, event_topics, address_variants
+from .rpc import get_client, run_sync
+
+logger = logging.getLogger(__name__)
+
+INDEXED_EVENTS = ('VoteCast', 'VoterWhitelisted', 'CandidateAdded', 'PhaseChanged')
+
+
+class ElectionIndexer:
+    def __init__(self, w3, confirmations=None, batch_size=None, start_block=0):
+        self.w3 = w3
+        self.confirmations = settings.BLOCKCHAIN_CONFIRMATIONS if confirmations is None else confirmations
+        self.batch_size = batch_size or settings.BLOCKCHAIN_LOG_BATCH_SIZE
+        self.start_block = start_block
+        self.topics = event_topics('Election', INDEXED_EVENTS)
+        self.rpc_url = getattr(w3.provider, 'endpoint_uri', None)
+        self._contracts = {}
+
+    async def _head(self):
+        return await get_client(self.rpc_url).block_number()
+
+    async def _get_logs(self, filter_params):
+        return await get_client(self.rpc_url).get_logs(filter_params)
+
+    def _elections(self):
+        elections = {}
+        for election in Election.objects.exclude(contract_address__isnull=True).exclude(contract_address=''):
+            try:
+                elections[Web3.to_checksum_address(election.contract_address)] = election
+            except ValueError:
+                logger.warning("Election %s has an invalid contract address %r", election.id, election.contract_address)
+        return elections
+
+    def _checkpoints(self, addresses):
+        ChainCheckpoint.objects.bulk_create(
+            [ChainCheckpoint(contract_address=address, last_block=self.start_block - 1) for address in addresses],
+            ignore_conflicts=True,
+        )
+        return {
+            checkpoint.contract_address: checkpoint.last_block
+            for checkpoint in ChainCheckpoint.objects.filter(contract_address__in=addresses)
+        }
+
+    def _decode(self, log):
+        address = Web3.to_checksum_address(log['address'])
+        if address not in self._contracts:
+            self._contracts[address] = election_contract(self.w3, address)
+        name = self.topics[Web3.to_hex(log['topics'][0])]
+        return getattr(self._contracts[address].events, name)().process_log(log)
+
+    def run_once(self):
+        """
+        Index every confirmed block not yet indexed. Returns event counts.
+        """
+        stats = Counter()
+        elections = self._elections()
+        if not elections:
+            return stats
+
+        checkpoints = self._checkpoints(list(elections))
+        head = run_sync(self._head()) - self.confirmations
+        from_block = min(checkpoints.values()) + 1
+
+        while from_block <= head:
+            to_block = min(from_block + self.batch_size - 1, head)
+            # Only fetch contracts that still need this range
+            addresses = [address for address, last_block in checkpoints.items() if last_block < to_block]
+            logs = run_sync(self._get_logs({
+                'fromBlock': from_block,
+                'toBlock': to_block,
+                'address': addresses,
+                'topics': [list(self.topics)],
+            }))
+
+            events = defaultdict(lambda: defaultdict(list))
+            for log in logs:
+                address = Web3.to_checksum_address(log['address'])
+                if log['blockNumber'] <= checkpoints[address]:
+                    continue
+                event = self._decode(log)
+                events[address][event['event']].append(event)
+
+            with transaction.atomic():
+                for address, by_name in events.items():
+                    self._ingest(elections[address], by_name, stats)
+                ChainCheckpoint.objects.filter(
+                    contract_address__in=addresses, last_block__lt=to_block
+                ).update(last_block=to_block)
+
+            for address in addresses:
+                checkpoints[address] = max(checkpoints[address], to_block)
+            stats['blocks'] += to_block - from_block + 1
+            from_block = to_block + 1
+
+        return stats
+
+    def _ingest(self, election, events, stats):
+        if events['VoteCast']:
+            self._ingest_votes(election, events['VoteCast'], stats)
+        if events['VoterWhitelisted']:
+            self._ingest_whitelist(election, events['VoterWhitelisted'], stats)
+        if events['CandidateAdded']:
+            self._check_candidates(election, events['CandidateAdded'], stats)
+        if events['PhaseChanged']:
+            status = ELECTION_PHASES[events['PhaseChanged'][-1]['args']['newPhase']]
+            Election.objects.filter(pk=election.pk).update(status=status)
+            invalidate_election_metadata(election.pk)
+            stats['phase_changes'] += len(events['PhaseChanged'])
+        invalidate_election(election.pk)
+
+    def _ingest_votes(self, election, events, stats):
+        positions = dict(
+            Position.objects.filter(election=election).values_list('position_id', 'pk')
+        )
+        candidates = {
+            candidate_id: (pk, position_pk)
+            for candidate_id, pk, position_pk in Candidate.objects.filter(election=election)
+            .values_list('candidate_id', 'pk', 'position_id')
+        }
+
+        wallets = set()
+        for event in events:
+            wallets |= address_variants(event['args']['voter'])
+        # Submitted transaction hashes are kept so verification can still check them
+        existing = {
+            (position_pk, wallet.lower()): (vote_pk, candidate_pk, tx_hash)
+            for vote_pk, position_pk, candidate_pk, wallet, tx_hash
+            in Vote.objects.filter(election=election, wallet__in=wallets)
+            .values_list('pk', 'position_id', 'candidate_id', 'wallet', 'transaction_hash')
+        }
+
+        new_votes, confirmed = [], []
+        for event in events:
+            args = event['args']
+            position_pk = positions.get(args['positionId'])
+            candidate = candidates.get(args['candidateId'])
+            if position_pk is None or candidate is None or candidate[1] != position_pk:
+                stats['unknown_candidates'] += 1
+                logger.warning(
+                    "Election %s: VoteCast for unknown position %s / candidate %s",
+                    election.id, args['positionId'], args['candidateId'],
+                )
+                continue
+
+            wallet = args['voter'].lower()
+            tx_hash = Web3.to_hex(event['transactionHash'])
+            key = (position_pk, wallet)
+            if key in existing:
+                if existing[key] is None:
+                    continue
+                vote_pk, candidate_pk, submitted_hash = existing[key]
+                if candidate_pk != candidate[0]:
+                    # Left unconfirmed for reconciliation to report
+                    stats['candidate_mismatches'] += 1
+                    logger.warning(
+                        "Election %s: vote %s is for candidate %s in the database but %s on chain",
+                        election.id, vote_pk, candidate_pk, candidate[0],
+                    )
+                    continue
+                confirmed.append(Vote(
+                    pk=vote_pk,
+                    transaction_hash=submitted_hash or tx_hash,
+                    block_number=event['blockNumber'],
+                ))
+            else:
+                existing[key] = None  # Created in this batch
+                new_votes.append(Vote(
+                    election=election,
+                    position_id=position_pk,
+                    candidate_id=candidate[0],
+                    wallet=wallet,
+                    transaction_hash=tx_hash,
+                    block_number=event['blockNumber'],
+                ))
+
+        Vote.objects.bulk_update(confirmed, ['transaction_hash', 'block_number'], batch_size=1000)
+        Vote.objects.bulk_create(new_votes, batch_size=1000)
+        record_votes(new_votes)
+        stats['votes_confirmed'] += len(confirmed)
+        stats['votes_created'] += len(new_votes)
+
+    def _ingest_whitelist(self, election, events, stats):
+        wallets = set()
+        for event in events:
+            wallets |= address_variants(event['args']['voter'])
+        users = {
+            wallet.lower(): user_pk
+            for user_pk, wallet in User.objects.filter(wallet_address__in=wallets).values_list('pk', 'wallet_address')
+        }
+
+        entries = {}
+        for event in events:
+            user_pk = users.get(event['args']['voter'].lower())
+            if user_pk is None:
+                stats['unknown_wallets'] += 1
+                continue
+            entries[user_pk] = VoterElectionWhitelist(voter_id=user_pk, election=election, is_whitelisted=True, on_chain=True)
+
+        VoterElectionWhitelist.objects.bulk_create(
+            list(entries.values()),
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['voter', 'election'],
+            update_fields=['is_whitelisted', 'on_chain'],
+        )
+        stats['whitelisted'] += len(entries)
+
+    def _check_candidates(self, election, events, stats):
+        known = set(
+            Candidate.objects.filter(election=election).values_list('position__position_id', 'candidate_id')
+        )
+        for event in events:
+            key = (event['args']['positionId'], event['args']['candidateId'])
+            if key in known:
+                stats['candidates'] += 1
+            else:
+                stats['unknown_candidates'] += 1
+                logger.warning("Election %s: CandidateAdded for unknown position %s / candidate %s", election.id, *key)
@@ -0,0 +1,165 @@
+"""
+Batched chain reads and election discovery from the ElectionFactory
+
+Instead of walking `getElectionCount`/`getElection(i)` and reading each
+election's metadata one call at a time, elections are discovered from the
+factory's ElectionCreated events and every remaining view call is sent in
+JSON-RPC batch requests, so a sync costs a handful of round trips however many
+elections the factory has created.
+"""
+from django.conf import settings
+from django.db import transaction
+from web3 import Web3
+
+from ..cache import invalidate_election, invalidate_election_metadata
+from ..models import Election, Position
+from .contracts import ELECTION_PHASES, election_contract, factory_contract
+
+
+class ChainReader:
+    """
+    Sends contract calls and eth_getLogs requests in JSON-RPC batches of
+    `batch_size`, counting the HTTP round trips made.
+    """
+
+    def __init__(self, w3, batch_size=None):
+        self.w3 = w3
+        self.batch_size = batch_size or settings.BLOCKCHAIN_RPC_BATCH_SIZE
+        self.round_trips = 0
+
+    def _execute(self, items, add):
+        results = []
+        for start in range(0, len(items), self.batch_size):
+            with self.w3.batch_requests() as batch:
+                for item in items[start:start + self.batch_size]:
+                    add(batch, item)
+                results.extend(batch.execute())
+            self.round_trips += 1
+        return results
+
+    def block_number(self):
+        self.round_trips += 1
+        return self.w3.eth.block_number
+
+    def call(self, functions, block_identifier='latest'):
+        """
+        Call a list of bound contract functions, e.g. ``contract.functions.phase()``,
+        at `block_identifier`. Results are returned in the same order.
+        """
+        return self._execute(
+            list(functions),
+            lambda batch, function: batch.add(function.call(block_identifier=block_identifier)),
+        )
+
+    def get_logs(self, filters):
+        """
+        Run a list of eth_getLogs filters. Returns one list of logs per filter.
+        """
+        return self._execute(list(filters), lambda batch, params: batch.add(self.w3.eth.get_logs(params)))
+
+    def get_event_logs(self, contract, event_name, from_block=0, to_block=None):
+        """
+        Decoded logs of one contract event, split into block ranges of
+        BLOCKCHAIN_LOG_BATCH_SIZE that are fetched together.
+        """
+        if to_block is None:
+            to_block = self.block_number()
+        event = getattr(contract.events, event_name)
+        step = settings.BLOCKCHAIN_LOG_BATCH_SIZE
+        filters = [
+            {
+                'fromBlock': start,
+                'toBlock': min(start + step - 1, to_block),
+                'address': contract.address,
+                'topics': [event.topic],
+            }
+            for start in range(from_block, to_block + 1, step)
+        ]
+        return [event().process_log(log) for logs in self.get_logs(filters) for log in logs]
+
+
+def discover_elections(reader, factory, from_block=0):
+    """
+    Elections created by `factory`, in creation order, as dicts with their
+    address, title, start and end time, position IDs and current status.
+    """
+    events = reader.get_event_logs(factory, 'ElectionCreated', from_block)
+    phases = reader.call(
+        election_contract(reader.w3, event['args']['electionAddress']).functions.phase() for event in events
+    )
+
+    return [
+        {
+            'address': Web3.to_checksum_address(event['args']['electionAddress']),
+            'title': event['args']['title'],
+            'start_time': event['args']['startTime'],
+            'end_time': event['args']['endTime'],
+            'position_ids': list(event['args']['positionIds']),
+            'status': ELECTION_PHASES[phase],
+            'block_number': event['blockNumber'],
+        }
+        for event, phase in zip(events, phases)
+    ]
+
+
+def _match(discovered):
+    """
+    Map each discovered contract address to a database election: by its stored
+    contract address, or else by the election owning its position IDs.
+    """
+    by_address = {
+        address.lower(): election_id
+        for election_id, address in Election.objects.exclude(contract_address__isnull=True)
+        .exclude(contract_address='').values_list('id', 'contract_address')
+    }
+    position_ids = {position_id for chain_election in discovered for position_id in chain_election['position_ids']}
+    by_position = dict(
+        Position.objects.filter(position_id__in=position_ids).values_list('position_id', 'election_id')
+    )
+
+    matches = {}
+    for chain_election in discovered:
+        address = chain_election['address']
+        if address.lower() in by_address:
+            matches[address] = by_address[address.lower()]
+            continue
+        owners = {by_position.get(position_id) for position_id in chain_election['position_ids']}
+        if len(owners) == 1 and None not in owners:
+            matches[address] = owners.pop()
+    return matches
+
+
+def sync_elections(w3, factory_address=None, from_block=0, batch_size=None):
+    """
+    Discover the factory's elections and store their contract address and
+    status on the matching database elections in one pass.
+    Returns a report of what was discovered and updated.
+    """
+    reader = ChainReader(w3, batch_size)
+    discovered = discover_elections(reader, factory_contract(w3, factory_address), from_block)
+    matches = _match(discovered)
+
+    elections = Election.objects.in_bulk(set(matches.values()))
+    changed = {}
+    for chain_election in discovered:
+        election = elections.get(matches.get(chain_election['address']))
+        if election is None:
+            continue
+        if election.contract_address != chain_election['address'] or election.status != chain_election['status']:
+            election.contract_address = chain_election['address']
+            election.status = chain_election['status']
+            changed[election.id] = election
+
+    with transaction.atomic():
+        Election.objects.bulk_update(list(changed.values()), ['contract_address', 'status'], batch_size=1000)
+        for election_id in changed:
+            invalidate_election(election_id)
+            invalidate_election_metadata(election_id)
+
+    return {
+        'discovered': len(discovered),
+        'matched': len(matches),
+        'updated': len(changed),
+        'unmatched': [election['address'] for election in discovered if election['address'] not in matches],
+        'round_trips': reader.round_trips,
+    }
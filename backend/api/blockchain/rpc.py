@@ -0,0 +1,322 @@
+"""
+Asyncio JSON-RPC client pool for blockchain access
+
+One RPCClient per endpoint and event loop keeps a pooled aiohttp session, sends
+identical in-flight requests once, gathers requests issued within a short
+window into JSON-RPC batches, caps concurrent HTTP requests per endpoint and
+retries transport failures with exponential backoff. Calls are encoded and
+decoded with eth_utils and web3's ABI codec, and logs and receipts are
+formatted here like web3 formats them, so only public APIs are used.
+
+Synchronous code (views, management commands) goes through `run_sync`, which
+runs coroutines on one shared background loop so requests from every thread
+are pooled, coalesced and batched together.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import itertools
+import json
+import os
+import random
+import threading
+import weakref
+from collections import Counter
+
+import aiohttp
+from django.conf import settings
+from eth_utils.abi import function_abi_to_4byte_selector, get_abi_input_types, get_abi_output_types
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from eth_abi.exceptions import DecodingError
+from web3.exceptions import BadFunctionCallOutput, Web3Exception
+
+# HTTP statuses worth retrying: rate limiting and unavailable upstream nodes
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class RPCError(Web3Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+LOG_FIELDS = {
+    'integers': ('blockNumber', 'logIndex', 'transactionIndex'),
+    'bytes': ('blockHash', 'data', 'transactionHash'),
+    'addresses': ('address',),
+}
+RECEIPT_FIELDS = {
+    'integers': (
+        'blockNumber', 'cumulativeGasUsed', 'effectiveGasPrice', 'gasUsed', 'status', 'transactionIndex', 'type',
+    ),
+    'bytes': ('blockHash', 'logsBloom', 'transactionHash', 'root'),
+    'addresses': ('contractAddress', 'from', 'to'),
+}
+
+
+def _block_param(block_identifier):
+    return hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+
+
+def _call_data(function):
+    """
+    Calldata of a bound contract function, e.g. ``contract.functions.phase()``
+    """
+    arguments = function.w3.codec.encode(get_abi_input_types(function.abi), function.args)
+    return Web3.to_hex(function_abi_to_4byte_selector(function.abi) + arguments)
+
+
+def _format(raw, fields):
+    formatted = dict(raw)
+    for key in fields['integers']:
+        if isinstance(formatted.get(key), str):
+            formatted[key] = int(formatted[key], 16)
+    for key in fields['bytes']:
+        if formatted.get(key) is not None:
+            formatted[key] = HexBytes(formatted[key])
+    for key in fields['addresses']:
+        if formatted.get(key):
+            formatted[key] = Web3.to_checksum_address(formatted[key])
+    return formatted
+
+
+def format_log(log):
+    """
+    A raw JSON-RPC log formatted as web3 returns it
+    """
+    formatted = _format(log, LOG_FIELDS)
+    formatted['topics'] = [HexBytes(topic) for topic in log.get('topics', [])]
+    return AttributeDict(formatted)
+
+
+def format_receipt(receipt):
+    """
+    A raw JSON-RPC transaction receipt formatted as web3 returns it
+    """
+    formatted = _format(receipt, RECEIPT_FIELDS)
+    formatted['logs'] = [format_log(log) for log in receipt.get('logs', [])]
+    return AttributeDict(formatted)
+
+
+class RPCClient:
+    """
+    JSON-RPC client for one endpoint, used from a single event loop
+    """
+
+    def __init__(self, url, batch_size=None, batch_delay=None, max_concurrency=None,
+                 retries=None, backoff=None, timeout=None):
+        self.url = url
+        self.batch_size = batch_size or settings.BLOCKCHAIN_RPC_BATCH_SIZE
+        self.batch_delay = settings.BLOCKCHAIN_RPC_BATCH_DELAY if batch_delay is None else batch_delay
+        self.max_concurrency = max_concurrency or settings.BLOCKCHAIN_RPC_MAX_CONCURRENCY
+        self.retries = settings.BLOCKCHAIN_RPC_RETRIES if retries is None else retries
+        self.backoff = settings.BLOCKCHAIN_RPC_BACKOFF if backoff is None else backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout or settings.BLOCKCHAIN_RPC_TIMEOUT)
+        self.stats = Counter()
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session = None
+        self._ids = itertools.count(1)
+        self._in_flight = {}
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    async def request(self, method, params=()):
+        """
+        Send one JSON-RPC request and return its result
+        """
+        params = list(params)
+        key = json.dumps([method, params], sort_keys=True)
+        self.stats['requests'] += 1
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self._pending.append((method, params, future))
+            self._schedule_flush()
+        else:
+            self.stats['coalesced'] += 1
+        # Shielded so one cancelled caller does not cancel the others' request
+        return await asyncio.shield(future)
+
+    def _schedule_flush(self):
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_delay, self._flush)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch):
+        futures = {}
+        payload = []
+        for method, params, future in batch:
+            request_id = next(self._ids)
+            futures[request_id] = future
+            payload.append({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params})
+
+        failure = RPCError("No response from the node")
+        try:
+            responses = await self._post(payload if len(payload) > 1 else payload[0])
+            if isinstance(responses, dict):
+                # A single response, or an error rejecting the whole batch
+                if responses.get('id') not in futures and 'error' in responses:
+                    failure = RPCError(responses['error'].get('message'), responses['error'].get('code'))
+                responses = [responses]
+            elif not isinstance(responses, list):
+                raise RPCError(f"Unexpected JSON-RPC response from {self.url}: {responses!r:.200}")
+
+            for response in responses:
+                if not isinstance(response, dict):
+                    continue
+                future = futures.pop(response.get('id'), None)
+                if future is None or future.done():
+                    continue
+                if 'error' in response:
+                    error = response['error'] if isinstance(response['error'], dict) else {'message': response['error']}
+                    future.set_exception(RPCError(error.get('message'), error.get('code')))
+                else:
+                    future.set_result(response.get('result'))
+        except RPCError as e:
+            failure = e
+        except Exception as e:
+            # Whatever went wrong, the callers must not wait forever
+            failure = RPCError(f"JSON-RPC request to {self.url} failed: {e!r}")
+
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(failure)
+
+    async def _post(self, payload):
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._semaphore:
+                    self.stats['http_requests'] += 1
+                    async with self._get_session().post(self.url, json=payload) as response:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except ValueError as e:
+                # Not JSON, e.g. an HTML error page served with status 200
+                raise RPCError(f"JSON-RPC request to {self.url} returned an invalid response: {e}") from e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in RETRY_STATUSES
+                if not retryable or attempt == self.retries:
+                    raise RPCError(f"JSON-RPC request to {self.url} failed: {e}") from e
+                self.stats['retries'] += 1
+                await asyncio.sleep(self.backoff * 2 ** attempt * (0.5 + random.random()))
+
+    async def block_number(self):
+        return int(await self.request('eth_blockNumber'), 16)
+
+    async def call(self, function, block_identifier='latest'):
+        """
+        Call a bound contract function, e.g. ``contract.functions.phase()``
+        """
+        data = await self.request('eth_call', [
+            {'to': function.address, 'data': _call_data(function)},
+            _block_param(block_identifier),
+        ])
+        try:
+            values = function.w3.codec.decode(get_abi_output_types(function.abi), Web3.to_bytes(hexstr=data))
+        except (DecodingError, TypeError, ValueError) as e:
+            # An empty 0x result usually means there is no contract at the address
+            raise BadFunctionCallOutput(
+                f"Could not decode the result of {function.fn_name} at {function.address}: {e}"
+            ) from e
+        return values[0] if len(values) == 1 else values
+
+    async def call_many(self, functions, block_identifier='latest'):
+        """
+        Call several contract functions concurrently; they are sent in batches
+        """
+        return await asyncio.gather(*(self.call(function, block_identifier) for function in functions))
+
+    async def get_logs(self, filter_params):
+        params = dict(filter_params)
+        for key in ('fromBlock', 'toBlock'):
+            if key in params:
+                params[key] = _block_param(params[key])
+        return [format_log(log) for log in await self.request('eth_getLogs', [params])]
+
+    async def get_transaction_receipt(self, transaction_hash):
+        receipt = await self.request('eth_getTransactionReceipt', [transaction_hash])
+        return None if receipt is None else format_receipt(receipt)
+
+
+_clients = weakref.WeakKeyDictionary()  # Event loop -> {url: RPCClient}
+
+
+def get_client(url=None):
+    """
+    Shared client for `url` (default BLOCKCHAIN_PROVIDER_URL) on the running event loop
+    """
+    url = url or settings.BLOCKCHAIN_PROVIDER_URL
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if url not in clients:
+        clients[url] = RPCClient(url)
+    return clients[url]
+
+
+_background = {'loop': None, 'pid': None}
+_background_lock = threading.Lock()
+
+
+def _background_loop():
+    with _background_lock:
+        # A forked worker cannot use its parent's loop thread
+        if _background['loop'] is None or _background['pid'] != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='rpc-client', daemon=True).start()
+            _background.update(loop=loop, pid=os.getpid())
+        return _background['loop']
+
+
+@atexit.register
+def _close_background_clients():
+    loop = _background['loop']
+    if loop is None or _background['pid'] != os.getpid():
+        return
+    for client in list(_clients.get(loop, {}).values()):
+        asyncio.run_coroutine_threadsafe(client.close(), loop).result(timeout=5)
+
+
+def run_sync(coroutine, timeout=None):
+    """
+    Run a coroutine on the shared background loop from synchronous code and
+    return its result, or RPCError after `timeout` seconds (by default long
+    enough for every retry of one request). Must not be called from a running
+    event loop.
+    """
+    if timeout is None:
+        timeout = settings.BLOCKCHAIN_RPC_TIMEOUT * (settings.BLOCKCHAIN_RPC_RETRIES + 2)
+    future = asyncio.run_coroutine_threadsafe(coroutine, _background_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise RPCError(f"Blockchain request did not complete within {timeout:g} seconds")
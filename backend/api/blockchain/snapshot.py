@@ -0,0 +1,81 @@
+"""
+On-chain election results snapshots
+
+Results are read from the Election contract through the shared RPC client, one
+concurrent round of calls per level (positions, candidates, votes) pinned to a
+single block, and cached per block number. Every viewer between two blocks is
+served the same snapshot, and viewers missing the cache at the same time share
+in-flight requests, so node load depends on the block rate, not on the number
+of viewers.
+"""
+from django.conf import settings
+from web3 import Web3
+
+from ..cache import election_cache
+from .contracts import election_contract
+from .rpc import get_client, run_sync
+
+HEAD_CACHE_KEY = 'chain:head'
+
+
+async def _block_number():
+    return await get_client().block_number()
+
+
+def latest_block():
+    """
+    Current block number, shared by all requests for CHAIN_HEAD_CACHE_TIMEOUT seconds
+    """
+    cache = election_cache()
+    block_number = cache.get(HEAD_CACHE_KEY)
+    if block_number is None:
+        block_number = run_sync(_block_number())
+        cache.set(HEAD_CACHE_KEY, block_number, timeout=settings.CHAIN_HEAD_CACHE_TIMEOUT)
+    return block_number
+
+
+async def read_results(address, block_number, client=None):
+    """
+    Results of an Election contract at `block_number`, as
+    ``{position_id: [{'candidateId': ..., 'votes': ...}]}``
+    """
+    client = client or get_client()
+    functions = election_contract(Web3(), address).functions
+
+    position_count = await client.call(functions.getPositionCount(), block_number)
+    position_ids = await client.call_many(
+        [functions.positionIds(index) for index in range(position_count)], block_number
+    )
+    candidate_ids = await client.call_many(
+        [functions.getCandidatesForPosition(position_id) for position_id in position_ids], block_number
+    )
+    pairs = [
+        (position_id, candidate_id)
+        for position_id, candidates in zip(position_ids, candidate_ids)
+        for candidate_id in candidates
+    ]
+    votes = await client.call_many([functions.getCandidateVotes(*pair) for pair in pairs], block_number)
+
+    results = {position_id: [] for position_id in position_ids}
+    for (position_id, candidate_id), vote_count in zip(pairs, votes):
+        results[position_id].append({'candidateId': candidate_id, 'votes': vote_count})
+    return results
+
+
+def results_snapshot(election):
+    """
+    ``{'blockNumber': ..., 'results': ...}`` for an election with a contract
+    address, read from the chain at most once per block.
+    """
+    block_number = latest_block()
+    cache = election_cache()
+    key = f"election:{election.id}:chain-results:{election.contract_address.lower()}:{block_number}"
+
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = {
+            'blockNumber': block_number,
+            'results': run_sync(read_results(election.contract_address, block_number)),
+        }
+        cache.set(key, snapshot, timeout=settings.ELECTION_CACHE_TIMEOUT)
+    return snapshot
@@ -0,0 +1,173 @@
+"""
+Batched on-chain whitelist sync
+
+Voters whitelisted in the database but not yet seen on chain (no indexed
+VoterWhitelisted event, `on_chain=False`) are sent to the election contract with
+`whitelistVoters`, in chunks as large as WHITELIST_SYNC_MAX_GAS (capped below the
+block gas limit) allows. The transactions are signed with
+BLOCKCHAIN_ADMIN_PRIVATE_KEY and sent back to back with locally tracked nonces.
+
+Before each attempt the candidates are checked with batched `isWhitelisted`
+calls, so voters already on chain, including those of chunks that went through
+before a failure, are never sent twice. `on_chain` itself is left to the indexer.
+"""
+import logging
+from collections import Counter
+
+from django.conf import settings
+from eth_account import Account
+from web3 import Web3
+from web3.exceptions import Web3Exception
+
+from ..models import VoterElectionWhitelist
+from .contracts import election_contract
+from .reader import ChainReader
+
+logger = logging.getLogger(__name__)
+
+# Headroom over the estimated gas of each transaction
+GAS_MARGIN = 1.2
+# Share of the block gas limit a single transaction may use
+BLOCK_GAS_SHARE = 0.8
+
+
+class WhitelistSyncError(Exception):
+    pass
+
+
+class WhitelistSync:
+    def __init__(self, w3, private_key=None, max_gas=None, retries=None):
+        private_key = private_key or settings.BLOCKCHAIN_ADMIN_PRIVATE_KEY
+        if not private_key:
+            raise WhitelistSyncError("BLOCKCHAIN_ADMIN_PRIVATE_KEY is not set")
+        self.w3 = w3
+        self.account = Account.from_key(private_key)
+        block_gas_limit = w3.eth.get_block('latest')['gasLimit']
+        self.max_gas = min(
+            max_gas or settings.WHITELIST_SYNC_MAX_GAS,
+            int(block_gas_limit * BLOCK_GAS_SHARE / GAS_MARGIN),
+        )
+        self.retries = settings.WHITELIST_SYNC_RETRIES if retries is None else retries
+        self.reader = ChainReader(w3)
+        self._nonce = None
+
+    def pending_voters(self, election):
+        """
+        ``{checksum address: wallet as stored}`` of voters to whitelist on chain,
+        and the wallets that are not valid addresses
+        """
+        wallets = VoterElectionWhitelist.objects.filter(
+            election=election, is_whitelisted=True, on_chain=False, voter__wallet_address__isnull=False,
+        ).order_by('id').values_list('voter__wallet_address', flat=True)
+
+        pending, invalid = {}, []
+        for wallet in wallets:
+            try:
+                pending[Web3.to_checksum_address(wallet)] = wallet
+            except ValueError:
+                invalid.append(wallet)
+        return pending, invalid
+
+    def _not_whitelisted(self, contract, addresses):
+        flags = self.reader.call(contract.functions.isWhitelisted(address) for address in addresses)
+        return [address for address, whitelisted in zip(addresses, flags) if not whitelisted]
+
+    def _estimate(self, contract, chunk):
+        return contract.functions.whitelistVoters(chunk).estimate_gas({'from': self.account.address})
+
+    def _chunk_size(self, contract, addresses):
+        """
+        Addresses per transaction, from the estimated cost of one and two addresses
+        """
+        if len(addresses) < 2:
+            return len(addresses)
+        one = self._estimate(contract, addresses[:1])
+        per_address = max(self._estimate(contract, addresses[:2]) - one, 1)
+        return max(1, (self.max_gas - (one - per_address)) // per_address)
+
+    def _chunks(self, contract, addresses):
+        """
+        Split addresses into chunks whose estimated gas stays under max_gas,
+        halving the chunk size whenever a chunk turns out too large
+        """
+        size = self._chunk_size(contract, addresses)
+        start = 0
+        while start < len(addresses):
+            chunk = addresses[start:start + size]
+            gas = self._estimate(contract, chunk)
+            while gas > self.max_gas and len(chunk) > 1:
+                size = max(1, size // 2)
+                chunk = chunk[:size]
+                gas = self._estimate(contract, chunk)
+            yield chunk, gas
+            start += len(chunk)
+
+    def _send(self, contract, chunk, gas):
+        if self._nonce is None:
+            self._nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+        transaction = contract.functions.whitelistVoters(chunk).build_transaction({
+            'from': self.account.address,
+            'nonce': self._nonce,
+            'gas': int(gas * GAS_MARGIN),
+        })
+        signed = self.account.sign_transaction(transaction)
+        transaction_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        self._nonce += 1
+        return transaction_hash
+
+    def sync_election(self, election, dry_run=False):
+        """
+        Whitelist on chain every voter of `election` that is only whitelisted in
+        the database. Returns counts of what was done.
+        """
+        stats = Counter()
+        contract = election_contract(self.w3, election.contract_address)
+        if contract.functions.admin().call() != self.account.address:
+            raise WhitelistSyncError(
+                f"Election {election.id}: {self.account.address} is not the admin of {contract.address}"
+            )
+
+        pending, invalid = self.pending_voters(election)
+        stats['invalid_wallets'] += len(invalid)
+        for wallet in invalid:
+            logger.warning("Election %s: cannot whitelist invalid wallet address %r", election.id, wallet)
+
+        addresses = list(pending)
+        attempt = 0
+        while True:
+            # Drops voters whitelisted on chain since the last indexer run or attempt
+            addresses = self._not_whitelisted(contract, addresses) if addresses else []
+            if attempt == 0:
+                stats['already_on_chain'] = len(pending) - len(addresses)
+            if not addresses or dry_run or attempt > self.retries:
+                break
+            if attempt:
+                stats['retries'] += 1
+            attempt += 1
+
+            sent = []
+            try:
+                for chunk, gas in self._chunks(contract, addresses):
+                    sent.append((chunk, self._send(contract, chunk, gas)))
+            except (Web3Exception, ValueError, OSError) as e:
+                # Later nonces would wait behind the failed one; the next attempt starts from the node's count
+                logger.warning("Election %s: sending a whitelist transaction failed: %s", election.id, e)
+                self._nonce = None
+
+            for chunk, transaction_hash in sent:
+                stats['transactions'] += 1
+                try:
+                    receipt = self.w3.eth.wait_for_transaction_receipt(
+                        transaction_hash, timeout=settings.WHITELIST_SYNC_RECEIPT_TIMEOUT,
+                    )
+                except Web3Exception as e:
+                    logger.warning("Election %s: no receipt for %s: %s", election.id, Web3.to_hex(transaction_hash), e)
+                    receipt = None
+                if receipt is not None and receipt['status'] == 1:
+                    stats['whitelisted'] += len(chunk)
+                else:
+                    stats['failed_transactions'] += 1
+                    self._nonce = None
+
+        stats['pending'] = len(addresses)
+        return stats
@@ -0,0 +1,189 @@
+"""
+Versioned response caching for election endpoints
+
+Every election has a version counter stored in the election cache. Cached
+payloads and ETags are keyed by that version, so bumping it after a write
+invalidates every cached response of the election at once.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def election_cache():
+    return caches[settings.ELECTION_CACHE_ALIAS]
+
+
+# Version of what derives from the election's own rows, positions and candidates, but not from votes
+METADATA = 'metadata-version'
+# Version of an election's electoral roll
+ROLL = 'roll-version'
+
+
+def _version_key(election_id, name='version'):
+    return f"election:{election_id}:{name}"
+
+
+def get_election_version(election_id, name='version'):
+    """
+    Current version of an election's cached data
+    """
+    cache = election_cache()
+    key = _version_key(election_id, name)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1 so an evicted counter never
+        # reuses a version that may still have payloads cached under it
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_election_version(election_id, name='version'):
+    cache = election_cache()
+    try:
+        return cache.incr(_version_key(election_id, name))
+    except ValueError:
+        return get_election_version(election_id, name)
+
+
+def invalidate_election(election_id):
+    """
+    Invalidate the cached responses of an election once the current
+    transaction commits, so readers never cache pre-commit data under the
+    new version.
+    """
+    transaction.on_commit(lambda: bump_election_version(election_id))
+
+
+def invalidate_election_metadata(election_id):
+    """
+    Invalidate what is cached from an election's own rows, positions and
+    candidates once the current transaction commits
+    """
+    transaction.on_commit(lambda: bump_election_version(election_id, METADATA))
+
+
+def invalidate_electoral_roll(election_id):
+    """
+    Invalidate what is cached from an election's electoral roll once the
+    current transaction commits
+    """
+    transaction.on_commit(lambda: bump_election_version(election_id, ROLL))
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in [tag.strip() for tag in header.split(',')]
+
+
+def cached_response(request, election_id, name, build):
+    """
+    Serve ``build()`` for an election from the cache, honouring If-None-Match.
+
+    ``name`` identifies the endpoint; ``build`` is only called on a cache miss.
+    With the per-process locmem backend, a vote recorded by another process
+    does not bump this process's version, so responses and ETags are also
+    rebuilt every ELECTION_RESPONSE_MAX_AGE seconds.
+    """
+    version = get_election_version(election_id)
+    if settings.ELECTION_RESPONSE_MAX_AGE:
+        version = f"{version}.{int(time.time() // settings.ELECTION_RESPONSE_MAX_AGE)}"
+    etag = '"%s"' % hashlib.md5(f"{name}:{election_id}:{version}".encode()).hexdigest()
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    if _etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(cached_payload(election_id, name, version, build), headers=headers)
+
+
+def cached_payload(election_id, name, version, build):
+    """
+    ``build()`` for an election, cached under its version
+    """
+    cache = election_cache()
+    key = f"election:{election_id}:{name}:{version}"
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout=settings.ELECTION_CACHE_TIMEOUT)
+    return data
+
+
+class ProcessCache:
+    """
+    Size-bounded LRU cache of objects built from an election, held in this
+    process. ``load(election_id)`` builds an entry, or returns None if the
+    election has none. Entries are kept under the election's ``version_name``
+    version and reloaded once it is bumped.
+
+    The version is only shared between processes when ELECTION_CACHE_BACKEND
+    is. With the default per-process locmem backend, changes made by another
+    worker or by index_chain are only seen once the entry is older than
+    ``max_age`` seconds (None keeps entries until the version changes).
+    """
+    def __init__(self, version_name, load, max_size, max_age=None):
+        self.version_name = version_name
+        self.load = load
+        self.max_size = max_size
+        self.max_age = max_age
+        self.stats = Counter()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, election_id):
+        version = get_election_version(election_id, self.version_name)
+        with self._lock:
+            cached = self._entries.get(election_id)
+            if cached is None:
+                self.stats['misses'] += 1
+            elif cached[0] != version:
+                self.stats['stale'] += 1
+            elif self.max_age is not None and time.monotonic() - cached[1] > self.max_age:
+                self.stats['expired'] += 1
+            else:
+                self._entries.move_to_end(election_id)
+                self.stats['hits'] += 1
+                return cached[2]
+
+        # Built outside the lock: a change committed meanwhile bumps the
+        # version past the one stored here, so the entry is reloaded next time
+        loaded_at = time.monotonic()
+        entry = self.load(election_id)
+        with self._lock:
+            if entry is None:
+                self._entries.pop(election_id, None)
+                return None
+            self._entries[election_id] = (version, loaded_at, entry)
+            self._entries.move_to_end(election_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return entry
+
+    def info(self):
+        with self._lock:
+            lookups = sum(self.stats[name] for name in ('hits', 'misses', 'stale', 'expired'))
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "max_age": self.max_age,
+                "hits": self.stats['hits'],
+                "misses": self.stats['misses'],
+                "stale": self.stats['stale'],
+                "expired": self.stats['expired'],
+                "evictions": self.stats['evictions'],
+                "hit_rate": self.stats['hits'] / lookups if lookups else None,
+            }
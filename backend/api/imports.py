@@ -0,0 +1,111 @@
+"""
+Bulk electoral roll import
+
+Rows are validated one at a time as they are read, checked against existing
+student IDs with one set-based query per batch, and inserted with
+`bulk_create`. Invalid or duplicate rows are reported rather than aborting the
+import.
+"""
+import csv
+import io
+
+from django.db import transaction
+
+from .cache import invalidate_electoral_roll
+from .models import ElectoralRoll
+
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_BATCH_SIZE = 5000
+
+ROLL_FIELDS = ('student_id', 'first_name', 'last_name')
+
+
+def read_csv(uploaded_file):
+    """
+    Iterate over the rows of an uploaded CSV file as dicts, without reading
+    it into memory. The header row must name the roll fields.
+    """
+    return csv.DictReader(io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline=''))
+
+
+def _validate_row(row):
+    if not isinstance(row, dict):
+        return None, {"non_field_errors": "Expected an object"}
+
+    errors = {}
+    values = {}
+    for field in ROLL_FIELDS:
+        value = row.get(field)
+        value = str(value).strip() if value is not None else ''
+        max_length = ElectoralRoll._meta.get_field(field).max_length
+        if not value:
+            errors[field] = "This field is required."
+        elif len(value) > max_length:
+            errors[field] = f"Ensure this field has no more than {max_length} characters."
+        values[field] = value
+    return values, errors
+
+
+def _flush(election, batch, report):
+    existing = set(
+        ElectoralRoll.objects.filter(student_id__in=[values['student_id'] for _, values in batch])
+        .values_list('student_id', flat=True)
+    )
+
+    new_entries = []
+    for row_number, values in batch:
+        if values['student_id'] in existing:
+            report['duplicates'] += 1
+            report['errors'].append({
+                "row": row_number,
+                "student_id": values['student_id'],
+                "errors": {"student_id": "Student ID is already on the electoral roll."},
+            })
+        else:
+            new_entries.append(ElectoralRoll(election=election, **values))
+
+    ElectoralRoll.objects.bulk_create(new_entries, batch_size=len(batch))
+    report['created'] += len(new_entries)
+
+
+def import_electoral_roll(election, rows, batch_size=DEFAULT_IMPORT_BATCH_SIZE):
+    """
+    Import an iterable of row dicts into the electoral roll of `election`.
+
+    Returns a report with the number of rows created, the number of duplicates
+    and a list of per-row errors (rows are numbered from 1).
+    """
+    report = {"created": 0, "duplicates": 0, "invalid": 0, "errors": []}
+    seen = set()
+    batch = []
+
+    with transaction.atomic():
+        for row_number, row in enumerate(rows, 1):
+            values, errors = _validate_row(row)
+            if not errors and values['student_id'] in seen:
+                report['duplicates'] += 1
+                errors = {"student_id": "Student ID appears more than once in the import."}
+            elif errors:
+                report['invalid'] += 1
+
+            if errors:
+                report['errors'].append({
+                    "row": row_number,
+                    "student_id": (values or {}).get('student_id'),
+                    "errors": errors,
+                })
+                continue
+
+            seen.add(values['student_id'])
+            batch.append((row_number, values))
+            if len(batch) >= batch_size:
+                _flush(election, batch, report)
+                batch = []
+
+        if batch:
+            _flush(election, batch, report)
+        if report['created']:
+            invalidate_electoral_roll(election.id)
+
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
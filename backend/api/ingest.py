@@ -0,0 +1,213 @@
+"""
+Async vote ingestion
+
+`submit_vote` validates a vote with the single query of
+`validation.vote_problem`. The ('election', 'position', 'wallet') unique
+constraint still guards against two concurrent votes for the same position.
+The insert, its tally update and the cache invalidation run in one
+transaction on Django's thread for synchronous database work.
+
+With VOTE_WRITE_BEHIND enabled, validated votes are handed to a VoteInserter
+instead, which writes the votes submitted on the event loop in batches of up
+to VOTE_WRITE_BATCH_SIZE, at most VOTE_WRITE_BATCH_DELAY seconds after the
+first one arrived. Each submitter still waits for its own vote to be
+committed or rejected before getting its response.
+"""
+import asyncio
+import weakref
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .cache import invalidate_election
+from .models import Vote
+from .tally import record_votes
+from .validation import ALREADY_VOTED, normalize_wallet, vote_problem
+
+VOTE_FIELDS = ('election', 'position', 'candidate', 'wallet')
+
+# Inserters by event loop
+_inserters = weakref.WeakKeyDictionary()
+
+
+class VoteRejected(Exception):
+    pass
+
+
+def _parse(data):
+    missing = [field for field in VOTE_FIELDS if data.get(field) in (None, '')]
+    if missing:
+        raise VoteRejected(f"Missing fields: {', '.join(missing)}")
+    try:
+        election_id, position_id, candidate_id = (int(data[field]) for field in ('election', 'position', 'candidate'))
+    except (TypeError, ValueError):
+        raise VoteRejected("election, position and candidate must be IDs")
+
+    wallet = normalize_wallet(str(data['wallet']))
+    if len(wallet) > Vote._meta.get_field('wallet').max_length:
+        raise VoteRejected("Invalid wallet address")
+    transaction_hash = data.get('transaction_hash') or None
+    if transaction_hash is not None and (
+        not isinstance(transaction_hash, str)
+        or len(transaction_hash) > Vote._meta.get_field('transaction_hash').max_length
+    ):
+        raise VoteRejected("Invalid transaction hash")
+
+    return Vote(
+        election_id=election_id,
+        position_id=position_id,
+        candidate_id=candidate_id,
+        wallet=wallet,
+        transaction_hash=transaction_hash,
+    )
+
+
+async def validate_vote(data):
+    """
+    An unsaved Vote for the submitted `data`, or VoteRejected
+    """
+    vote = _parse(data)
+    problem = await sync_to_async(vote_problem)(vote.election_id, vote.position_id, vote.candidate_id, vote.wallet)
+    if problem:
+        raise VoteRejected(problem)
+    return vote
+
+
+def _insert(votes):
+    Vote.objects.bulk_create(votes)
+    record_votes(votes)
+    for election_id in {vote.election_id for vote in votes}:
+        invalidate_election(election_id)
+
+
+def write_votes(votes):
+    """
+    Insert validated votes in one transaction. Returns, for each vote, the
+    saved Vote or a VoteRejected if its wallet already voted for the position.
+    """
+    results = [None] * len(votes)
+    seen = set()
+    batch = []
+    for index, vote in enumerate(votes):
+        key = (vote.election_id, vote.position_id, vote.wallet)
+        if key in seen:
+            results[index] = VoteRejected(ALREADY_VOTED)
+        else:
+            seen.add(key)
+            batch.append((index, vote))
+
+    try:
+        with transaction.atomic():
+            _insert([vote for _, vote in batch])
+    except IntegrityError:
+        # Some of the votes already exist: insert each under a savepoint to find which
+        with transaction.atomic():
+            saved = []
+            for index, vote in batch:
+                vote.pk = None
+                try:
+                    with transaction.atomic():
+                        vote.save(force_insert=True)
+                except IntegrityError:
+                    results[index] = VoteRejected(ALREADY_VOTED)
+                else:
+                    saved.append(vote)
+            record_votes(saved)
+            for election_id in {vote.election_id for vote in saved}:
+                invalidate_election(election_id)
+
+    for index, vote in batch:
+        if results[index] is None:
+            results[index] = vote
+    return results
+
+
+def write_ballot(votes):
+    """
+    Insert the votes of one ballot in one transaction: all of them, or none
+    and VoteRejected if the wallet voted for one of the positions meanwhile
+    """
+    try:
+        with transaction.atomic():
+            _insert(votes)
+    except IntegrityError:
+        raise VoteRejected(ALREADY_VOTED)
+    return votes
+
+
+def save_vote(vote):
+    """
+    Insert a validated vote with its tally, or VoteRejected if the wallet already voted for the position
+    """
+    result = write_votes([vote])[0]
+    if isinstance(result, VoteRejected):
+        raise result
+    return result
+
+
+class VoteInserter:
+    """
+    Write-behind inserter for the votes submitted on one event loop. One batch
+    is written at a time, which is all SQLite's single writer allows anyway.
+    """
+    def __init__(self, batch_size=None, delay=None):
+        self.batch_size = batch_size or settings.VOTE_WRITE_BATCH_SIZE
+        self.delay = settings.VOTE_WRITE_BATCH_DELAY if delay is None else delay
+        self.pending = []
+        self.stats = Counter()
+        self._full = asyncio.Event()
+        self._task = None
+
+    async def submit(self, vote):
+        """
+        Queue a validated vote and wait until it is committed
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((vote, future))
+        if len(self.pending) >= self.batch_size:
+            self._full.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return await future
+
+    async def _run(self):
+        while self.pending:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.delay)
+            except asyncio.TimeoutError:
+                pass
+            batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            if len(self.pending) < self.batch_size:
+                self._full.clear()
+
+            try:
+                results = await sync_to_async(write_votes)([vote for vote, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            self.stats['batches'] += 1
+            self.stats['votes'] += len(batch)
+
+            for (_, future), result in zip(batch, results):
+                # The submitter may have gone away; its vote is stored regardless
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+def get_inserter():
+    loop = asyncio.get_running_loop()
+    if loop not in _inserters:
+        _inserters[loop] = VoteInserter()
+    return _inserters[loop]
+
+
+async def submit_vote(data):
+    vote = await validate_vote(data)
+    if settings.VOTE_WRITE_BEHIND:
+        return await get_inserter().submit(vote)
+    return await sync_to_async(save_vote)(vote)
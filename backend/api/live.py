@@ -0,0 +1,163 @@
+"""
+Live election results over server-sent events
+
+All viewers of an election in a process share one ResultsBroadcaster. While
+it has subscribers, it checks the election's cache version at most
+RESULTS_PUSH_RATE times per second. The version is bumped whenever a vote is
+recorded or indexed. When it changed, the broadcaster reads the results once
+(through the same cache as the results endpoint) and pushes the candidates
+whose count changed to every subscriber. An update costs one read per
+election and process, whatever the number of viewers.
+
+The version is only shared between processes with a shared
+ELECTION_CACHE_BACKEND. With the default locmem backend, votes stored by
+index_chain or another worker do not bump this process's version, so the
+broadcaster also re-reads the tallies whenever its results are older than
+RESULTS_PUSH_MAX_AGE seconds.
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache import cached_payload, get_election_version
+from .models import Election
+from .tally import tally_election
+
+logger = logging.getLogger(__name__)
+
+# Broadcasters by event loop, then by election id
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+def _read_results(election_id, fresh=False):
+    version = get_election_version(election_id)
+    if fresh:
+        # Skips the payload cached under a version other processes may not have bumped
+        return version, tally_election(Election(pk=election_id))
+    return version, cached_payload(
+        election_id, 'results', version, lambda: tally_election(Election(pk=election_id)),
+    )
+
+
+def _changes(old, new):
+    """
+    Candidates of `new` whose vote count differs from `old`, in the results shape
+    """
+    changes = {}
+    for position_id, candidates in new.items():
+        previous = {candidate['candidateId']: candidate['votes'] for candidate in old.get(position_id, [])}
+        changed = [
+            candidate for candidate in candidates
+            if previous.get(candidate['candidateId']) != candidate['votes']
+        ]
+        if changed:
+            changes[position_id] = changed
+    return changes
+
+
+class ResultsBroadcaster:
+    def __init__(self, election_id):
+        self.election_id = election_id
+        self.version = None
+        self.results = None
+        self.read_at = None
+        self.subscribers = set()
+        self.stats = Counter()
+        self._ready = asyncio.Event()
+        self._task = None
+
+    async def subscribe(self):
+        """
+        A queue of ``(event, data)`` messages, and the current results
+        """
+        queue = asyncio.Queue(maxsize=settings.RESULTS_PUSH_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        await self._ready.wait()
+        # Deltas queued while waiting are absolute counts, so replaying them over this snapshot is harmless
+        return queue, self.results
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def _publish(self, event, data):
+        self.stats['updates'] += 1
+        for queue in self.subscribers:
+            if queue.full():
+                # A slow viewer skips the deltas it missed and catches up from a snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(('snapshot', self.results))
+                self.stats['resyncs'] += 1
+            else:
+                queue.put_nowait((event, data))
+            self.stats['messages'] += 1
+
+    async def _refresh(self):
+        expired = self.read_at is not None and time.monotonic() - self.read_at > settings.RESULTS_PUSH_MAX_AGE
+        if self.version is not None and not expired:
+            version = await sync_to_async(get_election_version)(self.election_id)
+            if version == self.version:
+                return
+        version, results = await sync_to_async(_read_results)(self.election_id, fresh=expired)
+        self.read_at = time.monotonic()
+        self.stats['reads'] += 1
+        changes = _changes(self.results, results) if self.results is not None else None
+        self.version, self.results = version, results
+        if changes:
+            self._publish('delta', changes)
+
+    async def _run(self):
+        try:
+            while self.subscribers:
+                try:
+                    await self._refresh()
+                    self._ready.set()
+                except Exception:
+                    logger.exception("Election %s: reading live results failed", self.election_id)
+                await asyncio.sleep(1 / settings.RESULTS_PUSH_RATE)
+        finally:
+            # Without viewers the results go stale; the next subscriber waits for a fresh read
+            self._ready.clear()
+            self.version = None
+            self.results = None
+            self.read_at = None
+
+
+def get_broadcaster(election_id):
+    per_loop = _broadcasters.setdefault(asyncio.get_running_loop(), {})
+    if election_id not in per_loop:
+        per_loop[election_id] = ResultsBroadcaster(election_id)
+    return per_loop[election_id]
+
+
+def _event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def results_events(election_id):
+    """
+    Server-sent events for an election: a `snapshot` of the results, then a
+    `delta` with the changed candidates after every update
+    """
+    broadcaster = get_broadcaster(election_id)
+    queue, results = await broadcaster.subscribe()
+    try:
+        yield _event('snapshot', results)
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), settings.RESULTS_PUSH_KEEPALIVE)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            yield _event(event, data)
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,108 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.blockchain.contracts import ELECTION_PHASES, get_web3, election_contract, factory_contract
+from api.blockchain.reader import ChainReader, discover_elections
+
+
+def sequential_discovery(w3, factory):
+    """
+    The original discovery: one eth_call per election and per metadata field.
+    Returns ``(elections, round_trips)``.
+    """
+    calls = 0
+
+    def call(function):
+        nonlocal calls
+        calls += 1
+        return function.call()
+
+    elections = []
+    for index in range(call(factory.functions.getElectionCount())):
+        election = election_contract(w3, call(factory.functions.getElection(index)))
+        elections.append({
+            'address': election.address,
+            'title': call(election.functions.title()),
+            'start_time': call(election.functions.startTime()),
+            'end_time': call(election.functions.endTime()),
+            'position_ids': [
+                call(election.functions.positionIds(position))
+                for position in range(call(election.functions.getPositionCount()))
+            ],
+            'status': ELECTION_PHASES[call(election.functions.phase())],
+        })
+    return elections, calls
+
+
+def deploy_factory(w3, elections, positions):
+    """
+    Deploy an ElectionFactory from its truffle artifact and create elections
+    on it from the first node account.
+    """
+    with open(settings.CONTRACTS_ABI_DIR / 'ElectionFactory.json') as artifact:
+        artifact = json.load(artifact)
+    account = w3.eth.accounts[0]
+    receipt = w3.eth.wait_for_transaction_receipt(
+        w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode']).constructor().transact({'from': account})
+    )
+    factory = factory_contract(w3, receipt['contractAddress'])
+
+    now = w3.eth.get_block('latest')['timestamp']
+    position_id = 1_000_000 + now % 1_000_000 * 1000
+    for index in range(elections):
+        position_ids = list(range(position_id, position_id + positions))
+        position_id += positions
+        w3.eth.wait_for_transaction_receipt(
+            factory.functions.createElection(
+                f"Benchmark election {index + 1}", now, now + 86400, position_ids
+            ).transact({'from': account})
+        )
+    return factory, receipt['blockNumber']
+
+
+class Command(BaseCommand):
+    help = 'Compare RPC round trips and latency of sequential and batched election discovery'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--factory', default=settings.ELECTION_FACTORY_ADDRESS, help='ElectionFactory address')
+        parser.add_argument('--deploy', action='store_true', help='Deploy a new factory and create elections on it')
+        parser.add_argument('--elections', type=int, default=100, help='Elections to create with --deploy')
+        parser.add_argument('--positions', type=int, default=3, help='Positions per election with --deploy')
+        parser.add_argument('--from-block', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, help='Requests per JSON-RPC batch')
+
+    def handle(self, *args, **options):
+        w3 = get_web3()
+        from_block = options['from_block']
+        if options['deploy']:
+            factory, from_block = deploy_factory(w3, options['elections'], options['positions'])
+            self.stdout.write(f"Deployed ElectionFactory at {factory.address} with {options['elections']} elections")
+        elif options['factory']:
+            factory = factory_contract(w3, options['factory'])
+        else:
+            raise CommandError('Set ELECTION_FACTORY_ADDRESS, pass --factory or use --deploy')
+
+        start = time.perf_counter()
+        expected, sequential_calls = sequential_discovery(w3, factory)
+        sequential_seconds = time.perf_counter() - start
+
+        reader = ChainReader(w3, options['batch_size'])
+        start = time.perf_counter()
+        discovered = discover_elections(reader, factory, from_block)
+        batched_seconds = time.perf_counter() - start
+
+        if [{key: value for key, value in election.items() if key != 'block_number'} for election in discovered] != expected:
+            self.stderr.write(self.style.ERROR('batched: elections differ from the sequential discovery'))
+
+        per_100 = 100 / max(len(expected), 1)
+        for name, round_trips, seconds in (
+            ('sequential', sequential_calls, sequential_seconds),
+            ('batched', reader.round_trips, batched_seconds),
+        ):
+            self.stdout.write(
+                f"{name:>10}: {round_trips:6d} round trips ({round_trips * per_100:8.1f} per 100 elections), "
+                f"{seconds * 1000:9.2f} ms"
+            )
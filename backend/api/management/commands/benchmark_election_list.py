@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.benchmarking import seed_election, measure
+from api.models import Election, User
+from api.views import ElectionViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Render /api/elections/ for growing numbers of elections and report query counts. '
+        'Fails if the query count depends on the number of elections.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[5, 50, 200],
+                            help='Numbers of elections to list')
+        parser.add_argument('--positions', type=int, default=3)
+        parser.add_argument('--candidates', type=int, default=9)
+        parser.add_argument('--parties', type=int, default=3)
+        parser.add_argument('--whitelisted', type=int, default=5)
+        parser.add_argument('--summary', action='store_true', help='List with ?view=summary')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        view = ElectionViewSet.as_view({'get': 'list'})
+
+        with transaction.atomic():
+            admin = User.objects.create(username='benchmark-admin', is_admin=True)
+            counts = []
+
+            for size in sorted(options['sizes']):
+                while Election.objects.count() < size:
+                    seed_election(
+                        options['positions'], options['candidates'], voters=0,
+                        parties=options['parties'], whitelisted=options['whitelisted'],
+                    )
+
+                request = factory.get('/api/elections/', {'view': 'summary'} if options['summary'] else {})
+                force_authenticate(request, user=admin)
+                with measure() as stats:
+                    response = view(request)
+                    response.render()
+
+                counts.append(stats['queries'])
+                self.stdout.write(
+                    f"{Election.objects.count():5d} elections: {stats['queries']:4d} queries, "
+                    f"{stats['seconds'] * 1000:8.2f} ms, {len(response.content) / 1024:9.1f} KiB"
+                )
+
+            transaction.set_rollback(True)
+
+        if len(set(counts)) > 1:
+            raise CommandError('Query count grows with the number of elections')
@@ -0,0 +1,58 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.benchmarking import seed_election
+from api.models import User, Vote
+from api.views import ElectionViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Export seeded elections of growing size through the streaming vote export and report peak memory. '
+        'Fails if peak memory grows with the number of votes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votes', type=int, nargs='+', default=[20000, 300000],
+                            help='Numbers of votes to export')
+        parser.add_argument('--positions', type=int, default=10)
+        parser.add_argument('--output', choices=['csv', 'ndjson'], default='csv')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        view = ElectionViewSet.as_view({'get': 'export_votes'})
+        peaks = []
+
+        with transaction.atomic():
+            admin = User.objects.create(username='benchmark-admin', is_admin=True)
+
+            for size in sorted(options['votes']):
+                positions = options['positions']
+                election = seed_election(positions, positions * 3, voters=max(size // positions, 1))
+                exported = Vote.objects.filter(election=election).count()
+
+                request = factory.get(f'/api/elections/{election.id}/export/votes/', {'output': options['output']})
+                force_authenticate(request, user=admin)
+
+                tracemalloc.start()
+                start = time.perf_counter()
+                response = view(request, pk=election.id)
+                total_bytes = sum(len(chunk) for chunk in response.streaming_content)
+                seconds = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                peaks.append(peak)
+                self.stdout.write(
+                    f"{exported:8d} votes: {total_bytes / 2**20:8.1f} MiB exported in {seconds:6.2f} s "
+                    f"({exported / seconds:9.0f} rows/s), peak memory {peak / 2**20:6.2f} MiB"
+                )
+
+            transaction.set_rollback(True)
+
+        if len(peaks) > 1 and peaks[-1] > 2 * peaks[0]:
+            raise CommandError('Peak memory grows with the number of exported votes')
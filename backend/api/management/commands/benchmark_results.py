@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.benchmarking import seed_election, measure
+from api.models import Position, Candidate, Vote
+from api.tally import tally_election, count_votes
+
+
+def per_candidate_results(election):
+    """
+    The original results implementation: one COUNT query per candidate
+    """
+    result_data = {}
+    for position in Position.objects.filter(election=election):
+        position_votes = []
+        for candidate in Candidate.objects.filter(position=position):
+            vote_count = Vote.objects.filter(election=election, position=position, candidate=candidate).count()
+            position_votes.append({'candidateId': candidate.candidate_id, 'votes': vote_count})
+        result_data[position.position_id] = position_votes
+    return result_data
+
+
+class Command(BaseCommand):
+    help = 'Compare query count and latency of election results against a seeded election'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--positions', type=int, default=40)
+        parser.add_argument('--candidates', type=int, default=300)
+        parser.add_argument('--voters', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded election instead of rolling back')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            election = seed_election(options['positions'], options['candidates'], options['voters'])
+            self.stdout.write(
+                f"Seeded election {election.id}: {options['positions']} positions, "
+                f"{options['candidates']} candidates, {Vote.objects.filter(election=election).count()} votes"
+            )
+
+            expected = per_candidate_results(election)
+            for name, func in (
+                ('per-candidate', per_candidate_results),
+                ('grouped count', count_votes),
+                ('tally table', tally_election),
+            ):
+                timings = []
+                for _ in range(options['repeat']):
+                    with measure() as stats:
+                        data = func(election)
+                    timings.append(stats['seconds'])
+                if data != expected:
+                    self.stderr.write(self.style.ERROR(f"{name}: results differ from the per-candidate tally"))
+                self.stdout.write(
+                    f"{name:>14}: {stats['queries']:5d} queries, "
+                    f"best {min(timings) * 1000:8.2f} ms, mean {sum(timings) / len(timings) * 1000:8.2f} ms"
+                )
+
+            if not options['keep']:
+                transaction.set_rollback(True)
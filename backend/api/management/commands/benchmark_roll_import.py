@@ -0,0 +1,58 @@
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.benchmarking import seed_election
+from api.models import User
+from api.views import ElectoralRollViewSet
+
+
+class Command(BaseCommand):
+    help = 'Measure electoral roll bulk import throughput for a synthetic CSV at several batch sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=40000)
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000, 5000])
+        parser.add_argument('--duplicates', type=float, default=0.05,
+                            help='Fraction of rows already on the roll before the import')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        lines = ['student_id,first_name,last_name'] + [f"B{i:09d},First{i},Last{i}" for i in range(rows)]
+        content = ('\n'.join(lines) + '\n').encode()
+        existing = int(rows * options['duplicates'])
+
+        factory = APIRequestFactory()
+        view = ElectoralRollViewSet.as_view({'post': 'bulk_import'})
+
+        for batch_size in options['batch_sizes']:
+            with transaction.atomic():
+                admin = User.objects.create(username='benchmark-admin', is_admin=True)
+                election = seed_election(1, 1, voters=0)
+                if existing:
+                    seed = SimpleUploadedFile('seed.csv', ('\n'.join(lines[:existing + 1]) + '\n').encode())
+                    request = factory.post('/api/electoral-roll/bulk-import/', {'election': election.id, 'file': seed})
+                    force_authenticate(request, user=admin)
+                    view(request)
+
+                upload = SimpleUploadedFile('roll.csv', content, content_type='text/csv')
+                request = factory.post(
+                    '/api/electoral-roll/bulk-import/',
+                    {'election': election.id, 'batch_size': batch_size, 'file': upload},
+                )
+                force_authenticate(request, user=admin)
+
+                start = time.perf_counter()
+                response = view(request)
+                seconds = time.perf_counter() - start
+
+                report = response.data
+                self.stdout.write(
+                    f"batch {batch_size:5d}: {rows} rows in {seconds:6.2f} s ({rows / seconds:8.0f} rows/s), "
+                    f"created {report['created']}, duplicates {report['duplicates']}"
+                )
+
+                transaction.set_rollback(True)
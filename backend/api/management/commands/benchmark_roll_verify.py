@@ -0,0 +1,82 @@
+import random
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.benchmarking import measure, seed_election
+from api.models import ElectoralRoll
+from api.roll import build_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare electoral roll membership checks: one exists() query per student against the in-memory '
+        'set and Bloom filter indexes, one by one and in batches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=100000, help='Students on the roll')
+        parser.add_argument('--lookups', type=int, default=20000, help='Student IDs checked by each method')
+        parser.add_argument('--on-roll', type=float, default=0.5, help='Share of checked students on the roll')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Student IDs per batch check')
+        parser.add_argument('--error-rate', type=float, default=0.01, help='Bloom filter false positive rate')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            election = seed_election(1, 1, voters=0, title='Roll verify benchmark')
+            student_ids = [f"V{election.id}-{i:09d}" for i in range(options['entries'])]
+            ElectoralRoll.objects.bulk_create(
+                (ElectoralRoll(election=election, student_id=student_id, first_name='First', last_name='Last')
+                 for student_id in student_ids),
+                batch_size=5000,
+            )
+
+            rng = random.Random(0)
+            lookups = [
+                rng.choice(student_ids) if rng.random() < options['on_roll'] else f"X{election.id}-{i:09d}"
+                for i in range(options['lookups'])
+            ]
+            expected = sum(student_id.startswith('V') for student_id in lookups)
+            self.stdout.write(f"{options['entries']} students on the roll, {len(lookups)} checks, {expected} on the roll")
+
+            with measure() as stats:
+                found = sum(
+                    ElectoralRoll.objects.filter(election=election, student_id=student_id).exists()
+                    for student_id in lookups
+                )
+            self._report('exists() per student', stats, found, expected, len(lookups))
+
+            for name, threshold in (('set', options['entries']), ('Bloom filter', 0)):
+                start = time.perf_counter()
+                index = build_index(election.id, bloom_threshold=threshold, error_rate=options['error_rate'])
+                load = time.perf_counter() - start
+                if index.student_ids is not None:
+                    size = sys.getsizeof(index.student_ids) + sum(sys.getsizeof(s) for s in index.student_ids)
+                else:
+                    size = len(index.bloom.bits)
+                self.stdout.write(f"{name}: loaded in {load * 1000:.0f} ms, {size / 2 ** 20:.2f} MiB")
+
+                with measure() as stats:
+                    found = sum(bool(index.members([student_id])) for student_id in lookups)
+                self._report(f"{name} per student", stats, found, expected, len(lookups))
+
+                batch_size = options['batch_size']
+                with measure() as stats:
+                    found = sum(
+                        sum(student_id in members for student_id in batch)
+                        for batch in (lookups[i:i + batch_size] for i in range(0, len(lookups), batch_size))
+                        for members in [index.members(batch)]
+                    )
+                self._report(f"{name} batches of {batch_size}", stats, found, expected, len(lookups))
+
+            transaction.set_rollback(True)
+
+    def _report(self, name, stats, found, expected, lookups):
+        self.stdout.write(
+            f"{name:>32}: {lookups / stats['seconds']:10.0f} checks/s, {stats['queries']:6d} queries, "
+            f"{found} on the roll"
+        )
+        if found != expected:
+            self.stderr.write(self.style.ERROR(f"{name}: expected {expected} on the roll"))
@@ -0,0 +1,85 @@
+import asyncio
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+
+from api.benchmarking import seed_election, vote_bodies, whitelisted_wallets
+from api.ingest import VoteInserter, VoteRejected, save_vote, validate_vote
+from api.models import Vote
+from api.tally import verify_tallies
+
+
+async def _submit_all(bodies, concurrency, inserter):
+    semaphore = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def submit(body):
+        nonlocal rejected
+        async with semaphore:
+            try:
+                vote = await validate_vote(body)
+                if inserter is None:
+                    await sync_to_async(save_vote)(vote)
+                else:
+                    await inserter.submit(vote)
+            except VoteRejected:
+                rejected += 1
+
+    await asyncio.gather(*(submit(body) for body in bodies))
+    return rejected
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare votes/second of one insert per vote against the write-behind inserter at several batch sizes, '
+        'with concurrent submitters and a share of duplicate votes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votes', type=int, default=5000)
+        parser.add_argument('--concurrency', type=int, default=500, help='Votes being submitted at once')
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[10, 50, 100, 500])
+        parser.add_argument('--delay', type=float, default=0.01, help='Seconds a vote waits for its batch to fill')
+        parser.add_argument('--duplicates', type=float, default=0.05, help='Share of votes submitted twice')
+        parser.add_argument('--positions', type=int, default=10)
+        parser.add_argument('--candidates', type=int, default=40)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['votes']} votes, {options['concurrency']} concurrent submitters, "
+            f"{options['duplicates']:.0%} submitted twice"
+        )
+        self._run('one insert per vote', None, options)
+        for batch_size in options['batch_sizes']:
+            self._run(f"batches of {batch_size}", VoteInserter(batch_size, options['delay']), options)
+
+    def _run(self, name, inserter, options):
+        election = seed_election(
+            options['positions'], options['candidates'], 0, title='Vote insert benchmark',
+            whitelisted=-(-options['votes'] // options['positions']),
+        )
+        try:
+            bodies = vote_bodies(election, whitelisted_wallets(election))[:options['votes']]
+            rng = random.Random(0)
+            duplicates = rng.sample(bodies, int(len(bodies) * options['duplicates']))
+            bodies += duplicates
+            rng.shuffle(bodies)
+
+            start = time.perf_counter()
+            rejected = asyncio.run(_submit_all(bodies, options['concurrency'], inserter))
+            elapsed = time.perf_counter() - start
+
+            stored = Vote.objects.filter(election=election).count()
+            consistent = (
+                stored == options['votes'] and rejected == len(duplicates) and not verify_tallies(election)
+            )
+            batches = f", {inserter.stats['batches']} batches" if inserter else ''
+            self.stdout.write(
+                f"{name:>20}: {len(bodies) / elapsed:8.1f} votes/s, {stored} stored, {rejected} rejected{batches}"
+            )
+            if not consistent:
+                self.stderr.write(self.style.ERROR(f"{name}: stored votes, rejections or tallies are wrong"))
+        finally:
+            election.delete()
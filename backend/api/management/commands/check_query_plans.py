@@ -0,0 +1,78 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from api.models import Position, Candidate, Vote, VoterElectionWhitelist, ElectoralRoll
+from api.tally import tally_queryset, count_queryset
+from api.validation import wallet_variants
+from api.verification import pending_votes
+
+# Placeholder values; the plans do not depend on them
+ELECTION_ID = 1
+POSITION_ID = 1
+WALLET = '0xabababababababababababababababababababab'
+STUDENT_ID = 'S0000000'
+
+HOT_QUERIES = {
+    'results: positions': lambda: Position.objects.filter(election=ELECTION_ID).values_list('position_id', flat=True),
+    'results: tallies': lambda: tally_queryset(ELECTION_ID),
+    'results: grouped vote count': lambda: count_queryset(ELECTION_ID),
+    'rebuild_tallies: vote counts': lambda: Vote.objects.filter(election=ELECTION_ID)
+        .values('position_id', 'candidate_id').annotate(total=Count('id')).order_by(),
+    'votes: duplicate check': lambda: Vote.objects.filter(
+        election=ELECTION_ID, position=POSITION_ID, wallet__in=wallet_variants(WALLET),
+    ),
+    'ballot: duplicate check': lambda: Vote.objects.filter(
+        election_id=ELECTION_ID, wallet__in=wallet_variants(WALLET), position_id__in=[POSITION_ID, POSITION_ID + 1],
+    ),
+    'user votes': lambda: Vote.objects.filter(wallet__in=wallet_variants(WALLET))
+        .select_related('election', 'position', 'candidate'),
+    'election votes': lambda: Vote.objects.filter(election=ELECTION_ID).order_by('pk'),
+    'candidates': lambda: Candidate.objects.filter(election=ELECTION_ID),
+    'whitelisted voters': lambda: VoterElectionWhitelist.objects.filter(election=ELECTION_ID, is_whitelisted=True),
+    'vote verification queue': lambda: pending_votes().filter(id__gt=0).order_by('id'),
+    'electoral roll verify': lambda: ElectoralRoll.objects.filter(election_id=ELECTION_ID, student_id=STUDENT_ID),
+}
+
+FULL_SCAN_PATTERNS = {
+    # SQLite reports "SCAN <table>" for a full table scan and "SEARCH" or
+    # "SCAN <table> USING ... INDEX" when an index is used
+    'sqlite': re.compile(r'\bSCAN (?!.*\bINDEX\b)(\S+)'),
+    'postgresql': re.compile(r'Seq Scan on (\S+)'),
+}
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot endpoint queries and fail if any of them plans a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Query plan checks are not supported on {connection.vendor}")
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Small tables make sequential scans cheaper than any index;
+                # disabling them shows whether an index is usable at all
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, build in HOT_QUERIES.items():
+                plan = build().explain()
+                scans = pattern.findall(plan)
+                if options['verbose_plans']:
+                    self.stdout.write(f"== {name}\n{plan}")
+                if scans:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"{name}: full scan of {', '.join(scans)}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"{name}: OK"))
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries regressed to a full table scan")
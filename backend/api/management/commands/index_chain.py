@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from web3.exceptions import Web3Exception
+
+from api.blockchain.contracts import get_web3
+from api.blockchain.indexer import ElectionIndexer
+
+
+class Command(BaseCommand):
+    help = (
+        'Index VoteCast, VoterWhitelisted, CandidateAdded and PhaseChanged events of every election contract '
+        'into the database, continuously or once with --once'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Index up to the current head and exit')
+        parser.add_argument('--confirmations', type=int, help='Blocks an event must be buried under before indexing')
+        parser.add_argument('--batch-size', type=int, help='Blocks per eth_getLogs call')
+        parser.add_argument('--start-block', type=int, default=0, help='First block for contracts never indexed')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds between polls')
+
+    def handle(self, *args, **options):
+        indexer = ElectionIndexer(
+            get_web3(),
+            confirmations=options['confirmations'],
+            batch_size=options['batch_size'],
+            start_block=options['start_block'],
+        )
+
+        try:
+            while True:
+                try:
+                    stats = indexer.run_once()
+                except (Web3Exception, OSError) as e:
+                    # Checkpoints only advance with committed ranges, so the next pass resumes where this one failed
+                    if options['once']:
+                        raise CommandError(f"Indexing failed: {e}")
+                    self.stderr.write(self.style.ERROR(f"Indexing failed, retrying in {options['poll_interval']:g} s: {e}"))
+                    time.sleep(options['poll_interval'])
+                    continue
+                if stats:
+                    self.stdout.write(', '.join(f"{key}: {value}" for key, value in sorted(stats.items())))
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import aiohttp
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from api.benchmarking import seed_election, vote_bodies, whitelisted_wallets
+from api.models import User
+
+SERVERS = {
+    # name: (command, vote URL path)
+    'wsgi': (lambda port: [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload'], '/api/votes/'),
+    'asgi': (
+        lambda port: [sys.executable, '-m', 'uvicorn', 'trustvote.asgi:application', '--port', str(port), '--log-level', 'warning'],
+        '/api/votes/submit/',
+    ),
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(url, timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+async def _post_votes(url, token, bodies, concurrency):
+    latencies, statuses = [], Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {'Authorization': f'Token {token}'}
+
+    async with aiohttp.ClientSession(headers=headers, connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        async def post(body):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with session.post(url, json=body) as response:
+                        await response.read()
+                        statuses[response.status] += 1
+                except aiohttp.ClientError:
+                    statuses['connection error'] += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(body) for body in bodies))
+        elapsed = time.perf_counter() - start
+
+    return elapsed, sorted(latencies), statuses
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test vote submission: start runserver (WSGI, /api/votes/) and uvicorn (ASGI, /api/votes/submit/) '
+        'on the configured database and post the same number of votes to each'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votes', type=int, default=2000, help='Votes posted to each server')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight')
+        parser.add_argument('--positions', type=int, default=10)
+        parser.add_argument('--candidates', type=int, default=40)
+        parser.add_argument('--server', choices=sorted(SERVERS), action='append', help='Only test these servers')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded election and its votes')
+
+    def handle(self, *args, **options):
+        servers = options['server'] or sorted(SERVERS)
+        # Every wallet votes once per position, with its own wallets for each server
+        voters = -(-options['votes'] // options['positions'])
+        election = seed_election(
+            options['positions'], options['candidates'], 0, title='Vote load test', whitelisted=voters * len(servers),
+        )
+        user = User.objects.create(username=f"load-test-{election.id}")
+        token = Token.objects.create(user=user)
+        wallets = whitelisted_wallets(election)
+        self.stdout.write(
+            f"Seeded election {election.id}: {options['positions']} positions, {options['candidates']} candidates"
+        )
+
+        try:
+            for index, name in enumerate(servers):
+                bodies = vote_bodies(election, wallets[index * voters:(index + 1) * voters])[:options['votes']]
+                self._run(name, token.key, bodies, options['concurrency'])
+        finally:
+            if not options['keep']:
+                election.delete()
+                user.delete()
+
+    def _run(self, name, token, bodies, concurrency):
+        command, path = SERVERS[name]
+        port = _free_port()
+        server = subprocess.Popen(
+            command(port), cwd=settings.BASE_DIR, env=os.environ.copy(),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not _wait_for(('127.0.0.1', port)):
+                raise CommandError(f"{name} server did not start on port {port}")
+            elapsed, latencies, statuses = asyncio.run(
+                _post_votes(f"http://127.0.0.1:{port}{path}", token, bodies, concurrency)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+        self.stdout.write(
+            f"{name} {path}: {len(bodies) / elapsed:8.1f} votes/s, "
+            f"p50 {percentile(0.5):7.1f} ms, p95 {percentile(0.95):7.1f} ms, p99 {percentile(0.99):7.1f} ms, "
+            f"responses {dict(sorted(statuses.items(), key=str))}"
+        )
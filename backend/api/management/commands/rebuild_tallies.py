@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Election
+from api.tally import rebuild_tallies, verify_tallies
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the running VoteTally counters from the raw Vote rows, or verify them with --verify. '
+        'Rebuild while no votes are being written to the election.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--election', type=int, action='append', dest='elections',
+                            help='Election ID to process (repeatable, defaults to all elections)')
+        parser.add_argument('--verify', action='store_true',
+                            help='Only compare the counters with the votes and report mismatches')
+
+    def handle(self, *args, **options):
+        elections = Election.objects.all()
+        if options['elections']:
+            elections = elections.filter(id__in=options['elections'])
+
+        failed = 0
+        for election in elections:
+            if options['verify']:
+                mismatches = verify_tallies(election)
+                if mismatches:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f"Election {election.id} ({election}): {len(mismatches)} mismatches"))
+                    for position_id, candidate_id, counted, stored in mismatches:
+                        self.stdout.write(f"  position {position_id} candidate {candidate_id}: counted {counted}, stored {stored}")
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"Election {election.id} ({election}): OK"))
+            else:
+                rebuild_tallies(election)
+                self.stdout.write(self.style.SUCCESS(f"Election {election.id} ({election}): rebuilt"))
+
+        if failed:
+            raise CommandError(f"{failed} election(s) have tallies that do not match their votes")
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Election
+from api.reconciliation import reconcile_elections
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare database votes and tallies of every election with its contract since the last '
+        'reconciliation and write a JSON diff report per election'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--election', type=int, action='append', help='Only reconcile these elections')
+        parser.add_argument('--from-block', type=int, help='Start from this block instead of the last reconciled one')
+        parser.add_argument('--confirmations', type=int, help='Blocks an event must be buried under')
+        parser.add_argument('--grace', type=int, help='Seconds before a vote without an indexed event is reported')
+        parser.add_argument('--output-dir', help='Directory for the reports (default RECONCILIATION_REPORT_DIR)')
+
+    def handle(self, *args, **options):
+        elections = Election.objects.all()
+        if options['election']:
+            elections = elections.filter(id__in=options['election'])
+
+        runs = reconcile_elections(
+            elections,
+            confirmations=options['confirmations'],
+            from_block=options['from_block'],
+            grace=options['grace'],
+            report_dir=options['output_dir'],
+        )
+        for run in runs:
+            style = self.style.WARNING if run.differences else self.style.SUCCESS
+            self.stdout.write(style(
+                f"Election {run.election_id}: blocks {run.from_block}-{run.to_block}, "
+                f"{run.differences} differences, report {run.report_path}"
+            ))
+        if not runs:
+            self.stdout.write('Nothing to reconcile')
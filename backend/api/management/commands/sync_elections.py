@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.blockchain.contracts import get_web3
+from api.blockchain.reader import sync_elections
+
+
+class Command(BaseCommand):
+    help = 'Discover elections from ElectionFactory events and sync their contract address and status'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--factory', default=settings.ELECTION_FACTORY_ADDRESS, help='ElectionFactory address')
+        parser.add_argument('--from-block', type=int, default=0, help='Block the factory was deployed at')
+        parser.add_argument('--batch-size', type=int, help='Requests per JSON-RPC batch')
+
+    def handle(self, *args, **options):
+        if not options['factory']:
+            raise CommandError('Set ELECTION_FACTORY_ADDRESS or pass --factory')
+
+        report = sync_elections(
+            get_web3(),
+            factory_address=options['factory'],
+            from_block=options['from_block'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(
+            f"Discovered {report['discovered']} elections, matched {report['matched']}, "
+            f"updated {report['updated']} in {report['round_trips']} RPC round trips"
+        )
+        for address in report['unmatched']:
+            self.stdout.write(self.style.WARNING(f"No matching election for {address}"))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.blockchain.contracts import get_web3
+from api.blockchain.whitelist_sync import WhitelistSync, WhitelistSyncError
+from api.models import Election
+
+
+class Command(BaseCommand):
+    help = (
+        'Whitelist on chain, with batched whitelistVoters transactions, the voters each election '
+        'whitelists in the database but whose VoterWhitelisted event has not been indexed'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--election', type=int, action='append', help='Only sync these elections')
+        parser.add_argument('--max-gas', type=int, help='Gas per transaction (default WHITELIST_SYNC_MAX_GAS)')
+        parser.add_argument('--retries', type=int, help='Resends of voters whose transaction failed')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the voters that would be sent')
+
+    def handle(self, *args, **options):
+        elections = Election.objects.exclude(contract_address__isnull=True).exclude(contract_address='')
+        if options['election']:
+            elections = elections.filter(id__in=options['election'])
+
+        try:
+            sync = WhitelistSync(get_web3(), max_gas=options['max_gas'], retries=options['retries'])
+        except WhitelistSyncError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"Sending from {sync.account.address}, up to {sync.max_gas} gas per transaction")
+
+        for election in elections.order_by('id'):
+            try:
+                stats = sync.sync_election(election, dry_run=options['dry_run'])
+            except WhitelistSyncError as e:
+                self.stderr.write(str(e))
+                continue
+            style = self.style.WARNING if stats['pending'] and not options['dry_run'] else self.style.SUCCESS
+            self.stdout.write(style(
+                f"Election {election.id}: " + ', '.join(f"{key}: {value}" for key, value in sorted(stats.items()))
+            ))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from web3.exceptions import Web3Exception
+
+from api.verification import verify_pending_votes, verification_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        'Verify the transaction hashes of pending votes against their receipts, '
+        'continuously or once with --once'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Check every pending vote once and exit')
+        parser.add_argument('--batch-size', type=int, help='Receipts fetched per batch')
+        parser.add_argument('--confirmations', type=int, help='Blocks a vote transaction must be buried under')
+        parser.add_argument('--grace', type=int, help='Seconds before a vote without a receipt is marked missing')
+        parser.add_argument('--poll-interval', type=float, default=10.0, help='Seconds between passes')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                try:
+                    stats = verify_pending_votes(
+                        batch_size=options['batch_size'],
+                        confirmations=options['confirmations'],
+                        grace=options['grace'],
+                    )
+                except (Web3Exception, OSError) as e:
+                    # Votes stay pending until a pass checks them, so the next pass picks them up again
+                    if options['once']:
+                        raise CommandError(f"Verification failed: {e}")
+                    self.stderr.write(self.style.ERROR(f"Verification failed, retrying in {options['poll_interval']:g} s: {e}"))
+                    time.sleep(options['poll_interval'])
+                    continue
+                if stats:
+                    metrics = verification_metrics()
+                    self.stdout.write(
+                        ', '.join(f"{key}: {value}" for key, value in sorted(stats.items()))
+                        + f" (backlog {metrics['backlog']})"
+                    )
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
@@ -0,0 +1,68 @@
+"""
+Per-process cache of election metadata
+
+Vote validation and the election endpoints keep reading the same election,
+position and candidate rows, which rarely change once voting is open. An
+ElectionMetadata compiles them (status, voting window, contract address,
+positions and which position each candidate runs for). Each process keeps up
+to ELECTION_METADATA_CACHE_SIZE of them, least recently used first out.
+
+Entries are kept under the election's metadata version in the election cache
+(see cache.ProcessCache). Model signals bump it, and so do the phase endpoint
+and the chain indexer (through Election.save or explicit calls). Votes do not
+bump it. With a shared ELECTION_CACHE_BACKEND every process reloads an
+election right after it changes. With the default locmem backend only the
+process that made the change does, and the others reload entries older than
+ELECTION_METADATA_CACHE_TTL seconds.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import METADATA, ProcessCache
+from .models import Election, Position, Candidate
+
+
+class ElectionMetadata:
+    def __init__(self, election, positions, candidates):
+        self.election_id = election['id']
+        self.status = election['status']
+        self.start_time = election['start_time']
+        self.end_time = election['end_time']
+        self.contract_address = election['contract_address']
+        self.positions = positions  # position pk => on-chain position ID
+        self.candidate_positions = candidates  # candidate pk => position pk
+
+    def voting_problem(self, now=None):
+        """
+        Why votes cannot be cast right now, or None
+        """
+        now = now or timezone.now()
+        if self.status != 'Voting':
+            return "Voting is not open for this election"
+        if now < self.start_time:
+            return "Voting has not started yet"
+        if now > self.end_time:
+            return "Voting has ended"
+        return None
+
+
+def _load(election_id):
+    election = (
+        Election.objects.filter(pk=election_id)
+        .values('id', 'status', 'start_time', 'end_time', 'contract_address')
+        .first()
+    )
+    if election is None:
+        return None
+    positions = dict(Position.objects.filter(election_id=election_id).values_list('pk', 'position_id'))
+    candidates = dict(Candidate.objects.filter(election_id=election_id).values_list('pk', 'position_id'))
+    return ElectionMetadata(election, positions, candidates)
+
+
+metadata_cache = ProcessCache(
+    METADATA, _load, settings.ELECTION_METADATA_CACHE_SIZE, max_age=settings.ELECTION_METADATA_CACHE_TTL,
+)
+
+
+def election_metadata(election_id):
+    return metadata_cache.get(election_id)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-18 10:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_tallies(apps, schema_editor):
+    Vote = apps.get_model('api', 'Vote')
+    VoteTally = apps.get_model('api', 'VoteTally')
+
+    counts = Vote.objects.values('election_id', 'position_id', 'candidate_id').annotate(total=Count('id')).order_by()
+    VoteTally.objects.bulk_create([
+        VoteTally(
+            election_id=row['election_id'],
+            position_id=row['position_id'],
+            candidate_id=row['candidate_id'],
+            votes=row['total'],
+        )
+        for row in counts
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_electoralroll'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='api.candidate')),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='api.election')),
+                ('position', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='api.position')),
+            ],
+            options={
+                'unique_together': {('election', 'position', 'candidate')},
+            },
+        ),
+        migrations.RunPython(populate_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_votetally'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['election', 'position', 'name'], name='candidate_election_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['election', 'position', 'candidate'], name='vote_election_candidate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['wallet', '-timestamp'], name='vote_wallet_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voterelectionwhitelist',
+            index=models.Index(fields=['election', 'is_whitelisted', 'voter'], name='whitelist_election_status_idx'),
+        ),
+    ]
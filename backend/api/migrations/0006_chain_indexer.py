@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_address', models.CharField(max_length=42, unique=True)),
+                ('last_block', models.BigIntegerField(default=-1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='block_number',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='voterelectionwhitelist',
+            name='on_chain',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_chain_indexer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='verification_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('mismatched', 'Mismatched'), ('missing', 'Missing')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['verification_status', 'id'], name='vote_verification_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 10:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_vote_verification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_block', models.BigIntegerField()),
+                ('to_block', models.BigIntegerField()),
+                ('differences', models.PositiveIntegerField(default=0)),
+                ('report_path', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reconciliations', to='api.election')),
+            ],
+            options={
+                'ordering': ['-to_block'],
+            },
+        ),
+    ]
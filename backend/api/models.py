@@ -50,9 +50,14 @@ class VoterElectionWhitelist(models.Model):
     voter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='whitelisted_elections')
     election = models.ForeignKey(Election, on_delete=models.CASCADE, related_name='whitelisted_voters')
     is_whitelisted = models.BooleanField(default=False)
+    on_chain = models.BooleanField(default=False)  # Set once a VoterWhitelisted event has been indexed
 
     class Meta:
         unique_together = ('voter', 'election')  # Ensure a voter can only be whitelisted once per election
+        indexes = [
+            # Whitelist listings and bulk whitelisting filter on (election, is_whitelisted)
+            models.Index(fields=['election', 'is_whitelisted', 'voter'], name='whitelist_election_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.voter.username} - {self.election.title} - {'Whitelisted' if self.is_whitelisted else 'Not Whitelisted'}"
@@ -100,6 +105,10 @@ class Candidate(models.Model):
     
     class Meta:
         ordering = ['election', 'position', 'name']
+        indexes = [
+            # Candidate listings per election, in the default ordering
+            models.Index(fields=['election', 'position', 'name'], name='candidate_election_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.position.title}"
@@ -123,16 +132,77 @@ class Vote(models.Model):
     """
     Model representing a vote (off-chain record)
     """
+    VERIFICATION_STATUS = [
+        ('pending', 'Pending'),
+        ('confirmed', 'Confirmed'),
+        ('mismatched', 'Mismatched'),
+        ('missing', 'Missing'),
+    ]
+
     election = models.ForeignKey(Election, related_name='votes', on_delete=models.CASCADE)
     position = models.ForeignKey(Position, related_name='votes', on_delete=models.CASCADE)
     candidate = models.ForeignKey(Candidate, related_name='votes', on_delete=models.CASCADE)
     wallet = models.CharField(max_length=42)  # Voter's wallet address
     timestamp = models.DateTimeField(auto_now_add=True)
     transaction_hash = models.CharField(max_length=66, blank=True, null=True)  # Ethereum transaction hash
+    block_number = models.BigIntegerField(blank=True, null=True)  # Set once the VoteCast event has been indexed
+    verification_status = models.CharField(max_length=10, choices=VERIFICATION_STATUS, default='pending')
+    verified_at = models.DateTimeField(blank=True, null=True)  # When the transaction hash was checked on chain
     
     class Meta:
         ordering = ['-timestamp']
         unique_together = ('election', 'position', 'wallet')  # One vote per position per wallet
+        indexes = [
+            # Covers per-candidate counts of an election (tally rebuild and verification)
+            models.Index(fields=['election', 'position', 'candidate'], name='vote_election_candidate_idx'),
+            # Voting history of a wallet, newest first
+            models.Index(fields=['wallet', '-timestamp'], name='vote_wallet_timestamp_idx'),
+            # Verification queue, oldest first
+            models.Index(fields=['verification_status', 'id'], name='vote_verification_queue_idx'),
+        ]
     
     def __str__(self):
         return f"Vote: {self.wallet} -> {self.candidate.name} ({self.position.title})"
+
+class VoteTally(models.Model):
+    """
+    Model holding the running vote count of a candidate (denormalized from Vote)
+    """
+    election = models.ForeignKey(Election, related_name='tallies', on_delete=models.CASCADE)
+    position = models.ForeignKey(Position, related_name='tallies', on_delete=models.CASCADE)
+    candidate = models.ForeignKey(Candidate, related_name='tallies', on_delete=models.CASCADE)
+    votes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('election', 'position', 'candidate')  # One counter per candidate and position
+
+    def __str__(self):
+        return f"{self.candidate.name} ({self.position.title}): {self.votes}"
+
+class ChainCheckpoint(models.Model):
+    """
+    Model recording the last block indexed for a contract
+    """
+    contract_address = models.CharField(max_length=42, unique=True)
+    last_block = models.BigIntegerField(default=-1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.contract_address} @ {self.last_block}"
+
+class ReconciliationRun(models.Model):
+    """
+    Model recording a reconciliation of an election's votes against the chain
+    """
+    election = models.ForeignKey(Election, related_name='reconciliations', on_delete=models.CASCADE)
+    from_block = models.BigIntegerField()
+    to_block = models.BigIntegerField()
+    differences = models.PositiveIntegerField(default=0)
+    report_path = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-to_block']
+
+    def __str__(self):
+        return f"{self.election.title}: blocks {self.from_block}-{self.to_block} ({self.differences} differences)"
@@ -0,0 +1,22 @@
+from django.conf import settings
+from rest_framework import pagination
+
+
+class CursorPagination(pagination.CursorPagination):
+    """
+    Keyset pagination over an indexed, unique column.
+
+    Pagination is opt-in: a list is only paginated when the request carries a
+    `page_size` or `cursor` parameter, so clients expecting plain lists keep
+    working.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = '-id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
@@ -0,0 +1,191 @@
+"""
+Reconciliation of database votes against the chain
+
+For each election with a contract, a run compares, as of a confirmed block:
+
+- the database tally (VoteTally) with the contract's candidateVotes counters
+- the VoteCast events emitted since the previous run with the Vote rows, by
+  voter and position, reporting events without a row and rows recording a
+  different candidate
+- the Vote rows no indexed VoteCast event has confirmed (block_number unset)
+
+Events are streamed in windows of block ranges and matched with one set-based
+query per chunk of wallets, so memory depends on the window, not on the size
+of the election. Each run writes a JSON diff report and records the block it
+reached, and the next run starts from there.
+"""
+import asyncio
+import json
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from web3 import Web3
+
+from .blockchain.contracts import election_contract
+from .blockchain.rpc import get_client, run_sync
+from .blockchain.snapshot import read_results
+from .models import Position, Vote, ReconciliationRun
+from .tally import tally_queryset
+
+# Block ranges whose logs are requested together
+LOG_WINDOW = 10
+# Wallets per Vote lookup
+WALLET_CHUNK_SIZE = 1000
+
+
+async def _head():
+    return await get_client().block_number()
+
+
+async def _fetch_events(event, address, ranges):
+    client = get_client()
+    chunks = await asyncio.gather(*(
+        client.get_logs({'fromBlock': start, 'toBlock': end, 'address': address, 'topics': [event.topic]})
+        for start, end in ranges
+    ))
+    return [event.process_log(log) for logs in chunks for log in logs]
+
+
+def _block_ranges(from_block, to_block):
+    step = settings.BLOCKCHAIN_LOG_BATCH_SIZE
+    return [(start, min(start + step - 1, to_block)) for start in range(from_block, to_block + 1, step)]
+
+
+def _compare_tallies(election, block_number):
+    stored = {
+        (position_id, candidate_id): votes
+        for position_id, candidate_id, votes in tally_queryset(election)
+    }
+    on_chain = {
+        (position_id, candidate['candidateId']): candidate['votes']
+        for position_id, candidates in run_sync(read_results(election.contract_address, block_number)).items()
+        for candidate in candidates
+    }
+    return [
+        {"position_id": key[0], "candidate_id": key[1], "database": stored.get(key, 0), "chain": on_chain.get(key, 0)}
+        for key in sorted(set(stored) | set(on_chain))
+        if stored.get(key, 0) != on_chain.get(key, 0)
+    ]
+
+
+def _compare_events(election, events, report):
+    positions = dict(Position.objects.filter(election=election).values_list('position_id', 'pk'))
+    for start in range(0, len(events), WALLET_CHUNK_SIZE):
+        chunk = events[start:start + WALLET_CHUNK_SIZE]
+        # Decoded addresses are already checksummed; wallets may also be stored lowercase
+        wallets = {event['args']['voter'] for event in chunk}
+        wallets |= {wallet.lower() for wallet in wallets}
+        position_pks = {positions.get(event['args']['positionId']) for event in chunk} - {None}
+        # Filtering on positions too lets the (election, position, wallet) unique index serve the lookup
+        recorded = {
+            (position_id, wallet.lower()): candidate_id
+            for position_id, wallet, candidate_id in Vote.objects.filter(
+                election=election, position__in=position_pks, wallet__in=wallets
+            ).order_by().values_list('position__position_id', 'wallet', 'candidate__candidate_id')
+        }
+
+        for event in chunk:
+            args = event['args']
+            key = (args['positionId'], args['voter'].lower())
+            if key not in recorded:
+                report['missing_in_database'].append({
+                    "voter": args['voter'],
+                    "position_id": args['positionId'],
+                    "candidate_id": args['candidateId'],
+                    "transaction_hash": Web3.to_hex(event['transactionHash']),
+                    "block_number": event['blockNumber'],
+                })
+            elif recorded[key] != args['candidateId']:
+                report['candidate_mismatches'].append({
+                    "voter": args['voter'],
+                    "position_id": args['positionId'],
+                    "database_candidate_id": recorded[key],
+                    "chain_candidate_id": args['candidateId'],
+                    "transaction_hash": Web3.to_hex(event['transactionHash']),
+                })
+            else:
+                report['events_matched'] += 1
+        report['events'] += len(chunk)
+
+
+def _unconfirmed_votes(election, grace):
+    votes = Vote.objects.filter(
+        election=election,
+        block_number__isnull=True,
+        timestamp__lt=timezone.now() - timedelta(seconds=grace),
+    ).order_by('id')
+    return [
+        {"vote_id": vote_id, "wallet": wallet, "position_id": position_id, "transaction_hash": transaction_hash}
+        for vote_id, wallet, position_id, transaction_hash in votes
+        .values_list('id', 'wallet', 'position__position_id', 'transaction_hash').iterator(chunk_size=2000)
+    ]
+
+
+def reconcile_election(election, to_block, from_block=None, grace=None, report_dir=None):
+    """
+    Reconcile an election from the block after its previous run (or
+    `from_block`) up to `to_block`. Returns the ReconciliationRun, with the
+    JSON report written to `report_dir`.
+    """
+    grace = settings.VOTE_VERIFICATION_GRACE if grace is None else grace
+    if from_block is None:
+        last_run = election.reconciliations.first()
+        from_block = last_run.to_block + 1 if last_run else 0
+
+    report = {
+        "election": election.id,
+        "contract_address": election.contract_address,
+        "from_block": from_block,
+        "to_block": to_block,
+        "generated_at": timezone.now().isoformat(),
+        "events": 0,
+        "events_matched": 0,
+        "tally_differences": _compare_tallies(election, to_block),
+        "missing_in_database": [],
+        "candidate_mismatches": [],
+    }
+
+    event = election_contract(Web3(), election.contract_address).events.VoteCast()
+    ranges = _block_ranges(from_block, to_block)
+    for start in range(0, len(ranges), LOG_WINDOW):
+        events = run_sync(_fetch_events(event, election.contract_address, ranges[start:start + LOG_WINDOW]))
+        _compare_events(election, events, report)
+
+    report['unconfirmed_in_database'] = _unconfirmed_votes(election, grace)
+
+    differences = sum(
+        len(report[key])
+        for key in ('tally_differences', 'missing_in_database', 'candidate_mismatches', 'unconfirmed_in_database')
+    )
+    report_dir = Path(report_dir or settings.RECONCILIATION_REPORT_DIR)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    report_path = report_dir / f"election-{election.id}-{from_block}-{to_block}.json"
+    with open(report_path, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+
+    return ReconciliationRun.objects.create(
+        election=election,
+        from_block=from_block,
+        to_block=to_block,
+        differences=differences,
+        report_path=str(report_path),
+    )
+
+
+def reconcile_elections(elections, confirmations=None, **options):
+    """
+    Reconcile several elections up to the latest confirmed block.
+    Elections already reconciled up to that block are skipped.
+    """
+    confirmations = settings.BLOCKCHAIN_CONFIRMATIONS if confirmations is None else confirmations
+    to_block = run_sync(_head()) - confirmations
+
+    runs = []
+    for election in elections.exclude(contract_address__isnull=True).exclude(contract_address=''):
+        last_run = election.reconciliations.first()
+        if options.get('from_block') is None and last_run and last_run.to_block >= to_block:
+            continue
+        runs.append(reconcile_election(election, to_block, **options))
+    return runs
@@ -0,0 +1,102 @@
+"""
+Electoral roll membership index
+
+Every student checks the roll at registration and login. Each process keeps
+the student IDs of up to ELECTORAL_ROLL_CACHE_SIZE rolls in memory, loaded on
+first use and reloaded once the roll changes (see cache.ProcessCache). With
+the default locmem ELECTION_CACHE_BACKEND, changes made through another worker
+are only seen once the index is older than ELECTORAL_ROLL_CACHE_TTL seconds.
+
+Rolls of more than ELECTORAL_ROLL_BLOOM_THRESHOLD entries keep only a Bloom
+filter, a few bits per student instead of a Python string each. Students it
+rules out are answered from memory. The rest may be false positives, so they
+are confirmed with one query per batch.
+"""
+import hashlib
+import math
+
+from django.conf import settings
+
+from .cache import ROLL, ProcessCache
+from .models import ElectoralRoll
+
+MAX_BULK_VERIFY = 1000
+# Student IDs per confirming query, within SQLite's limit on query parameters
+CONFIRM_BATCH_SIZE = 500
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: the i-th position is a + i * b
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'little')
+        b = int.from_bytes(digest[8:], 'little') | 1
+        return [(a + i * b) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RollIndex:
+    """
+    Student IDs on one election's roll: a set, or a Bloom filter for large rolls
+    """
+    def __init__(self, election_id, student_ids=None, bloom=None):
+        self.election_id = election_id
+        self.student_ids = student_ids
+        self.bloom = bloom
+
+    def members(self, student_ids):
+        """
+        Those of `student_ids` that are on the roll
+        """
+        if self.student_ids is not None:
+            return {student_id for student_id in student_ids if student_id in self.student_ids}
+
+        candidates = [student_id for student_id in set(student_ids) if student_id in self.bloom]
+        members = set()
+        for start in range(0, len(candidates), CONFIRM_BATCH_SIZE):
+            members.update(
+                ElectoralRoll.objects
+                .filter(election_id=self.election_id, student_id__in=candidates[start:start + CONFIRM_BATCH_SIZE])
+                .values_list('student_id', flat=True)
+            )
+        return members
+
+
+def build_index(election_id, bloom_threshold=None, error_rate=None):
+    if bloom_threshold is None:
+        bloom_threshold = settings.ELECTORAL_ROLL_BLOOM_THRESHOLD
+    roll = ElectoralRoll.objects.filter(election_id=election_id).values_list('student_id', flat=True)
+
+    entries = roll.count()
+    if entries <= bloom_threshold:
+        return RollIndex(election_id, student_ids=frozenset(roll))
+
+    bloom = BloomFilter(entries, error_rate or settings.ELECTORAL_ROLL_BLOOM_ERROR_RATE)
+    for student_id in roll.iterator(chunk_size=10000):
+        bloom.add(student_id)
+    return RollIndex(election_id, bloom=bloom)
+
+
+roll_cache = ProcessCache(
+    ROLL, build_index, settings.ELECTORAL_ROLL_CACHE_SIZE, max_age=settings.ELECTORAL_ROLL_CACHE_TTL,
+)
+
+
+def roll_members(election_id, student_ids):
+    return roll_cache.get(election_id).members(student_ids)
+
+
+def on_roll(election_id, student_id):
+    return student_id in roll_members(election_id, [student_id])
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from .models import User, Election,VoterElectionWhitelist, ElectoralRoll, Position, Party, Candidate, Vote
+from .validation import normalize_wallet, vote_problem, ballot_problems
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -115,8 +116,12 @@ class ElectionSerializer(serializers.ModelSerializer):
         representation['updatedAt'] = representation.pop('updated_at')
         representation['contractAddress'] = representation.pop('contract_address')
         
-        # Get parties for this election's candidates
-        parties = Party.objects.filter(candidates__election=instance).distinct()
+        # Get parties for this election's candidates, from the prefetched candidates when available
+        if 'candidates' in getattr(instance, '_prefetched_objects_cache', {}):
+            parties = {candidate.party_id: candidate.party for candidate in instance.candidates.all() if candidate.party_id}
+            parties = sorted(parties.values(), key=lambda party: party.pk)
+        else:
+            parties = Party.objects.filter(candidates__election=instance).distinct()
         representation['parties'] = PartySerializer(parties, many=True).data
         
         return representation
@@ -171,9 +176,42 @@ class ElectionSerializer(serializers.ModelSerializer):
         return instance
     
     def get_whitelisted_voters(self, obj):
-        whitelisted = VoterElectionWhitelist.objects.filter(election=obj, is_whitelisted=True)
+        # ElectionViewSet prefetches the whitelist into `whitelisted_entries` for list and detail views
+        whitelisted = getattr(obj, 'whitelisted_entries', None)
+        if whitelisted is None:
+            whitelisted = VoterElectionWhitelist.objects.filter(election=obj, is_whitelisted=True).select_related('voter', 'election')
         return VoterElectionWhitelistSerializer(whitelisted, many=True).data
     
+class ElectionSummarySerializer(serializers.ModelSerializer):
+    """
+    Scalar election fields plus counts, without nested positions or whitelist.
+    Expects the queryset to be annotated by ElectionViewSet.
+    """
+    position_count = serializers.IntegerField(read_only=True)
+    candidate_count = serializers.IntegerField(read_only=True)
+    whitelist_count = serializers.IntegerField(read_only=True)
+    votes_cast = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Election
+        fields = ('id', 'title', 'description', 'start_time', 'end_time', 'status', 'created_at', 'updated_at',
+                 'contract_address', 'position_count', 'candidate_count', 'whitelist_count', 'votes_cast')
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        # Convert field names to camelCase for frontend, matching ElectionSerializer
+        representation['electionId'] = representation.pop('id')
+        representation['startTime'] = representation.pop('start_time')
+        representation['endTime'] = representation.pop('end_time')
+        representation['createdAt'] = representation.pop('created_at')
+        representation['updatedAt'] = representation.pop('updated_at')
+        representation['contractAddress'] = representation.pop('contract_address')
+        representation['positionCount'] = representation.pop('position_count')
+        representation['candidateCount'] = representation.pop('candidate_count')
+        representation['whitelistCount'] = representation.pop('whitelist_count')
+        representation['votesCast'] = representation.pop('votes_cast')
+        return representation
+
 class ElectoralRollSerializer(serializers.ModelSerializer):
     election_title = serializers.CharField(source='election.title', read_only=True)
 
@@ -191,27 +229,90 @@ class VoterElectionWhitelistSerializer(serializers.ModelSerializer):
         model = VoterElectionWhitelist
         fields = ('id', 'voter', 'voter_name', 'election', 'election_title', 'is_whitelisted')
 
+class PrimaryKeyIdField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key of a related object, taken as an integer without looking the
+    object up. The serializer must check that it exists.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
 class VoteSerializer(serializers.ModelSerializer):
+    # Checked together in validate() instead of one lookup each
+    election = PrimaryKeyIdField(queryset=Election.objects.all())
+    position = PrimaryKeyIdField(queryset=Position.objects.all())
+    candidate = PrimaryKeyIdField(queryset=Candidate.objects.all())
+
     class Meta:
         model = Vote
-        fields = ('id', 'election', 'position', 'candidate', 'wallet', 'timestamp', 'transaction_hash')
-        read_only_fields = ('id', 'timestamp')
+        fields = (
+            'id', 'election', 'position', 'candidate', 'wallet', 'timestamp', 'transaction_hash',
+            'verification_status', 'verified_at',
+        )
+        read_only_fields = ('id', 'timestamp', 'verification_status', 'verified_at')
+        # One vote per position and wallet is checked in validate()
+        validators = []
+
+    def validate_wallet(self, value):
+        return normalize_wallet(value)
     
     def validate(self, attrs):
-        # Ensure the candidate belongs to the election and position
-        candidate = attrs.get('candidate')
-        election = attrs.get('election')
-        position = attrs.get('position')
-        
-        if candidate.election != election:
-            raise serializers.ValidationError("Candidate does not belong to this election")
-        
-        if candidate.position != position:
-            raise serializers.ValidationError("Candidate does not belong to this position")
-        
-        # Check if the user has already voted for this position in this election
-        wallet = attrs.get('wallet')
-        if Vote.objects.filter(election=election, position=position, wallet=wallet).exists():
-            raise serializers.ValidationError("You have already voted for this position in this election")
-        
+        # Partial updates check the stored values of the fields they leave out
+        ids = {
+            field: attrs[field] if field in attrs else getattr(self.instance, f"{field}_id")
+            for field in ('election', 'position', 'candidate')
+        }
+        wallet = attrs['wallet'] if 'wallet' in attrs else self.instance.wallet
+
+        # Candidate, position and election consistency, voting window, whitelist and earlier votes
+        problem = vote_problem(
+            ids['election'], ids['position'], ids['candidate'], wallet,
+            exclude_vote=self.instance.pk if self.instance else None,
+        )
+        if problem:
+            raise serializers.ValidationError(problem)
+
+        # Saved as foreign key ids, so the vote never holds half-loaded related objects
+        for field in ('election', 'position', 'candidate'):
+            if field in attrs:
+                attrs[f"{field}_id"] = attrs.pop(field)
+        return attrs
+
+class BallotSelectionSerializer(serializers.Serializer):
+    position = serializers.IntegerField()
+    candidate = serializers.IntegerField()
+
+class BallotSerializer(serializers.Serializer):
+    """
+    All the selections of one voter in an election, validated together
+    """
+    MAX_SELECTIONS = 100
+
+    election = serializers.IntegerField()
+    wallet = serializers.CharField(max_length=42)
+    transaction_hash = serializers.CharField(max_length=66, required=False, allow_null=True, allow_blank=True)
+    selections = BallotSelectionSerializer(many=True, allow_empty=False)
+
+    def validate_wallet(self, value):
+        return normalize_wallet(value)
+
+    def validate(self, attrs):
+        if len(attrs['selections']) > self.MAX_SELECTIONS:
+            raise serializers.ValidationError({"selections": f"At most {self.MAX_SELECTIONS} selections per ballot"})
+
+        problem, problems = ballot_problems(
+            attrs['election'], attrs['wallet'],
+            [(selection['position'], selection['candidate']) for selection in attrs['selections']],
+        )
+        if problem:
+            raise serializers.ValidationError(problem)
+        if problems:
+            raise serializers.ValidationError({
+                "selections": {str(position_id): problem for position_id, problem in problems.items()}
+            })
         return attrs
@@ -0,0 +1,52 @@
+"""
+Signal handlers keeping derived election data in step with model changes
+"""
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_election, invalidate_election_metadata, invalidate_electoral_roll
+from .models import Election, Position, Candidate, Party, VoterElectionWhitelist, ElectoralRoll
+
+
+@receiver([post_save, post_delete], sender=Election)
+def election_changed(sender, instance, **kwargs):
+    invalidate_election(instance.pk)
+    invalidate_election_metadata(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Position)
+@receiver([post_save, post_delete], sender=Candidate)
+def election_structure_changed(sender, instance, **kwargs):
+    invalidate_election(instance.election_id)
+    invalidate_election_metadata(instance.election_id)
+
+
+@receiver([post_save, post_delete], sender=VoterElectionWhitelist)
+def election_child_changed(sender, instance, **kwargs):
+    invalidate_election(instance.election_id)
+
+
+# Deleting a party nulls Candidate.party, so look the elections up beforehand
+@receiver([post_save, pre_delete], sender=Party)
+def party_changed(sender, instance, **kwargs):
+    election_ids = Candidate.objects.filter(party=instance).values_list('election_id', flat=True).distinct()
+    for election_id in election_ids:
+        invalidate_election(election_id)
+
+
+@receiver([post_save, post_delete], sender=ElectoralRoll)
+def electoral_roll_changed(sender, instance, **kwargs):
+    invalidate_electoral_roll(instance.election_id)
+
+
+# An entry moved to another election leaves its old roll too
+@receiver(pre_save, sender=ElectoralRoll)
+def electoral_roll_moving(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    old_election_ids = (
+        ElectoralRoll.objects.filter(pk=instance.pk).exclude(election_id=instance.election_id)
+        .values_list('election_id', flat=True)
+    )
+    for election_id in old_election_ids:
+        invalidate_electoral_roll(election_id)
@@ -0,0 +1,160 @@
+"""
+Vote tallying for election results
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from .cache import invalidate_election
+from .models import Position, Candidate, Vote, VoteTally
+
+
+def _results(election, candidates):
+    """
+    Group ``(position_id, candidate_id, votes)`` rows by position, keeping
+    positions without candidates as empty lists.
+    """
+    result_data = {
+        position_id: []
+        for position_id in Position.objects.filter(election=election).values_list('position_id', flat=True)
+    }
+
+    for position_id, candidate_id, vote_count in candidates:
+        result_data[position_id].append({
+            'candidateId': candidate_id,
+            'votes': vote_count
+        })
+
+    return result_data
+
+
+def tally_queryset(election):
+    """
+    ``(position_id, candidate_id, votes)`` rows read from the VoteTally counters
+    """
+    return (
+        Candidate.objects.filter(position__election=election)
+        .annotate(vote_count=Coalesce(
+            Sum('tallies__votes', filter=Q(tallies__election=election, tallies__position=F('position'))),
+            0,
+        ))
+        .order_by('position__title', 'position', 'name')
+        .values_list('position__position_id', 'candidate_id', 'vote_count')
+    )
+
+
+def count_queryset(election):
+    """
+    ``(position_id, candidate_id, votes)`` rows counted from the raw Vote rows
+    """
+    return (
+        Candidate.objects.filter(position__election=election)
+        .annotate(vote_count=Count(
+            'votes',
+            filter=Q(votes__election=election, votes__position=F('position')),
+        ))
+        .order_by('position__title', 'position', 'name')
+        .values_list('position__position_id', 'candidate_id', 'vote_count')
+    )
+
+
+def tally_election(election):
+    """
+    Read the results of an election from the running VoteTally counters.
+
+    Returns a dict of ``{position_id: [{'candidateId': ..., 'votes': ...}]}``
+    ordered like the positions and candidates themselves. The cost depends on
+    the number of candidates only, not on the number of votes cast.
+    """
+    return _results(election, tally_queryset(election))
+
+
+def count_votes(election):
+    """
+    Count the raw Vote rows of every candidate in an election with one
+    grouped query. Same return shape as ``tally_election``.
+    """
+    return _results(election, count_queryset(election))
+
+
+def _apply(counts):
+    for (election_id, position_id, candidate_id), delta in counts.items():
+        if not delta:
+            continue
+        lookup = dict(election_id=election_id, position_id=position_id, candidate_id=candidate_id)
+        updated = VoteTally.objects.filter(**lookup).update(votes=F('votes') + delta)
+        if not updated:
+            VoteTally.objects.get_or_create(**lookup)
+            VoteTally.objects.filter(**lookup).update(votes=F('votes') + delta)
+
+
+def _key(vote):
+    return (vote.election_id, vote.position_id, vote.candidate_id)
+
+
+def record_votes(votes):
+    """
+    Add newly inserted votes to the running counters.
+    Must be called in the same transaction that saved the votes.
+    """
+    with transaction.atomic():
+        _apply(Counter(_key(vote) for vote in votes))
+
+
+def remove_votes(votes):
+    """
+    Subtract deleted votes from the running counters.
+    Must be called in the same transaction that deleted the votes.
+    """
+    with transaction.atomic():
+        _apply(Counter({key: -count for key, count in Counter(_key(vote) for vote in votes).items()}))
+
+
+def rebuild_tallies(election):
+    """
+    Recompute the counters of an election from the raw Vote rows, and
+    invalidate its cached results
+    """
+    counts = (
+        Vote.objects.filter(election=election)
+        .values('position_id', 'candidate_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        VoteTally.objects.filter(election=election).delete()
+        VoteTally.objects.bulk_create([
+            VoteTally(
+                election=election,
+                position_id=row['position_id'],
+                candidate_id=row['candidate_id'],
+                votes=row['total'],
+            )
+            for row in counts
+        ], batch_size=1000)
+        invalidate_election(election.id)
+
+
+def verify_tallies(election):
+    """
+    Compare the counters of an election with the raw Vote rows.
+    Returns a list of ``(position_id, candidate_id, counted, stored)`` mismatches.
+    """
+    counted = {
+        (row['position_id'], row['candidate_id']): row['total']
+        for row in Vote.objects.filter(election=election)
+        .values('position_id', 'candidate_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    }
+    stored = {
+        (row['position_id'], row['candidate_id']): row['votes']
+        for row in VoteTally.objects.filter(election=election).values('position_id', 'candidate_id', 'votes')
+    }
+
+    mismatches = []
+    for key in sorted(set(counted) | set(stored)):
+        if counted.get(key, 0) != stored.get(key, 0):
+            mismatches.append((key[0], key[1], counted.get(key, 0), stored.get(key, 0)))
+    return mismatches
@@ -0,0 +1,392 @@
+import asyncio
+import io
+import tracemalloc
+from unittest import mock
+
+from aiohttp import web
+from asgiref.sync import sync_to_async
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput
+
+from .benchmarking import seed_election
+from .blockchain.contracts import election_contract
+from .blockchain.rpc import RPCClient, RPCError
+from .cache import election_cache, get_election_version
+from .models import Candidate, User, Vote, VoteTally, VoterElectionWhitelist
+from .tally import count_votes, rebuild_tallies, verify_tallies
+
+
+class WalletSpellingTests(TestCase):
+    """
+    A voter may not vote twice for a position by changing the case of their address
+    """
+    def setUp(self):
+        # Cached election versions outlive the rolled back rows of earlier tests
+        election_cache().clear()
+        self.election = seed_election(2, 4, voters=0)
+        self.wallet = Web3.to_checksum_address('0x' + 'ab' * 20)
+        voter = User.objects.create(username='voter', wallet_address=self.wallet)
+        VoterElectionWhitelist.objects.create(voter=voter, election=self.election, is_whitelisted=True)
+        self.client = APIClient()
+        self.client.force_authenticate(voter)
+        self.candidate = Candidate.objects.filter(election=self.election).first()
+
+    def vote(self, wallet):
+        return self.client.post('/api/votes/', {
+            'election': self.election.pk,
+            'position': self.candidate.position_id,
+            'candidate': self.candidate.pk,
+            'wallet': wallet,
+        }, format='json')
+
+    def assertOneVote(self):
+        self.assertEqual(Vote.objects.filter(election=self.election).count(), 1)
+        self.assertEqual(VoteTally.objects.get(candidate=self.candidate).votes, 1)
+
+    def test_vote_is_stored_under_lowercase_address(self):
+        response = self.vote(self.wallet)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['wallet'], self.wallet.lower())
+
+    def test_second_vote_with_other_spelling_is_rejected(self):
+        self.assertEqual(self.vote(self.wallet.lower()).status_code, 201)
+        self.assertEqual(self.vote(self.wallet).status_code, 400)
+        self.assertOneVote()
+
+    def test_earlier_vote_stored_with_checksum_address_is_found(self):
+        Vote.objects.create(
+            election=self.election, position_id=self.candidate.position_id, candidate=self.candidate,
+            wallet=self.wallet,
+        )
+        self.assertEqual(self.vote(self.wallet.lower()).status_code, 400)
+
+    def test_ballot_with_other_spelling_is_rejected(self):
+        self.assertEqual(self.vote(self.wallet).status_code, 201)
+        response = self.client.post('/api/votes/ballot/', {
+            'election': self.election.pk,
+            'wallet': self.wallet.lower(),
+            'selections': [{'position': self.candidate.position_id, 'candidate': self.candidate.pk}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertOneVote()
+
+
+class VoteSubmitTests(TestCase):
+    def setUp(self):
+        election_cache().clear()
+        self.election = seed_election(1, 2, voters=0, whitelisted=1)
+        self.candidate = Candidate.objects.filter(election=self.election).first()
+        voter = VoterElectionWhitelist.objects.get(election=self.election).voter
+        self.wallet = voter.wallet_address
+        self.token = Token.objects.create(user=voter).key
+
+    def submit(self, **fields):
+        return self.client.post('/api/votes/submit/', {
+            'election': self.election.pk,
+            'position': self.candidate.position_id,
+            'candidate': self.candidate.pk,
+            'wallet': self.wallet,
+            **fields,
+        }, content_type='application/json', HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_non_string_transaction_hash_is_rejected(self):
+        response = self.submit(transaction_hash=5)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Invalid transaction hash"})
+        self.assertFalse(Vote.objects.filter(election=self.election).exists())
+
+    def test_token_in_query_string_is_not_accepted(self):
+        response = self.client.post(f'/api/votes/submit/?token={self.token}', {
+            'election': self.election.pk,
+            'position': self.candidate.position_id,
+            'candidate': self.candidate.pk,
+            'wallet': self.wallet,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Vote.objects.filter(election=self.election).exists())
+
+
+class RPCClientTests(SimpleTestCase):
+    """
+    Malformed node responses fail the request instead of leaving it waiting
+    """
+    def request(self, body, method='eth_blockNumber', call=None):
+        async def handler(request):
+            return web.Response(text=body, content_type='text/html')
+
+        async def run():
+            app = web.Application()
+            app.router.add_post('/', handler)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            client = RPCClient(f'http://127.0.0.1:{port}/', retries=0, batch_delay=0)
+            try:
+                coroutine = client.call(call) if call is not None else client.request(method)
+                return await asyncio.wait_for(coroutine, 5)
+            finally:
+                await client.close()
+                await runner.cleanup()
+
+        return asyncio.run(run())
+
+    def test_html_response_fails_the_request(self):
+        with self.assertRaises(RPCError):
+            self.request('<html>Bad gateway</html>')
+
+    def test_unexpected_json_fails_the_request(self):
+        with self.assertRaises(RPCError):
+            self.request('5')
+
+    def test_empty_call_result_is_a_web3_error(self):
+        contract = election_contract(Web3(), '0x' + '11' * 20)
+        with self.assertRaises(BadFunctionCallOutput):
+            self.request('{"jsonrpc": "2.0", "id": 1, "result": "0x"}', call=contract.functions.getPositionCount())
+
+
+class ChainWorkerTests(SimpleTestCase):
+    """
+    The long-running chain commands survive a pass failing with a chain error
+    """
+    def run_worker(self, command, target):
+        calls = []
+
+        def fail_then_stop(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise RPCError("node unavailable")
+            raise KeyboardInterrupt
+
+        out, err = io.StringIO(), io.StringIO()
+        with mock.patch(target, side_effect=fail_then_stop):
+            call_command(command, poll_interval=0, stdout=out, stderr=err)
+        self.assertEqual(len(calls), 2)
+        self.assertIn("node unavailable", err.getvalue())
+        self.assertIn("Stopped", out.getvalue())
+
+    def test_index_chain_keeps_running(self):
+        self.run_worker('index_chain', 'api.blockchain.indexer.ElectionIndexer.run_once')
+
+    def test_verify_votes_keeps_running(self):
+        self.run_worker('verify_votes', 'api.management.commands.verify_votes.verify_pending_votes')
+
+    def test_once_reports_the_failure(self):
+        with mock.patch('api.blockchain.indexer.ElectionIndexer.run_once', side_effect=RPCError("node unavailable")):
+            with self.assertRaises(CommandError):
+                call_command('index_chain', once=True, stdout=io.StringIO())
+
+
+class VerificationMetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', is_admin=True))
+
+    def test_non_integer_election_is_rejected(self):
+        response = self.client.get('/api/votes/verification/', {'election': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_election_is_not_found(self):
+        self.assertEqual(self.client.get('/api/votes/verification/', {'election': 999999}).status_code, 404)
+
+
+class ElectoralRollImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', is_admin=True))
+
+    def test_non_integer_election_is_rejected(self):
+        response = self.client.post('/api/electoral-roll/bulk-import/', {
+            'election': 'abc',
+            'entries': [{'student_id': 'S1', 'first_name': 'A', 'last_name': 'B'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"error": "election must be an integer"})
+
+
+@override_settings(ELECTION_RESPONSE_MAX_AGE=5)
+class CachedResponseTests(TestCase):
+    """
+    A vote recorded by another process, which does not bump this process's
+    version, shows up once the cached response is older than its max age
+    """
+    def setUp(self):
+        election_cache().clear()
+        self.election = seed_election(1, 2, voters=0)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='viewer'))
+        self.url = f'/api/elections/{self.election.pk}/results/'
+
+    def results(self, now, **headers):
+        with mock.patch('api.cache.time.time', return_value=now):
+            return self.client.get(self.url, **headers)
+
+    def test_response_is_rebuilt_after_max_age(self):
+        first = self.results(1000.0)
+        VoteTally.objects.bulk_create(
+            VoteTally(election=self.election, position=candidate.position, candidate=candidate, votes=7)
+            for candidate in Candidate.objects.filter(election=self.election)
+        )
+
+        cached = self.results(1001.0, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        rebuilt = self.results(1006.0, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(rebuilt.status_code, 200)
+        self.assertNotEqual(rebuilt['ETag'], first['ETag'])
+        votes = [candidate['votes'] for position in rebuilt.data.values() for candidate in position]
+        self.assertEqual(votes, [7, 7])
+
+
+class ElectionListQueryTests(TestCase):
+    """
+    Listing elections takes the same number of queries however many there are
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', is_admin=True))
+
+    def assertQueriesDoNotGrow(self, params):
+        seed_election(2, 4, voters=0, parties=2, whitelisted=2)
+        with CaptureQueriesContext(connection) as one:
+            self.assertEqual(len(self.client.get('/api/elections/', params).data), 1)
+        for _ in range(19):
+            seed_election(2, 4, voters=0, parties=2, whitelisted=2)
+        with self.assertNumQueries(len(one)):
+            self.assertEqual(len(self.client.get('/api/elections/', params).data), 20)
+
+    def test_list(self):
+        self.assertQueriesDoNotGrow({})
+
+    def test_summary(self):
+        self.assertQueriesDoNotGrow({'view': 'summary'})
+
+
+@mock.patch('api.exports.EXPORT_CHUNK_SIZE', 50)
+class ExportTests(TestCase):
+    """
+    Exports are streamed in chunks, under WSGI and ASGI alike
+    """
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export_peak(self, voters):
+        election = seed_election(4, 8, voters=voters)
+        tracemalloc.start()
+        try:
+            response = self.client.get(f'/api/elections/{election.pk}/export/votes/')
+            rows = sum(chunk.count(b'\n') for chunk in response.streaming_content) - 1
+            return rows, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_memory_does_not_grow_with_votes(self):
+        small_rows, small_peak = self.export_peak(100)
+        large_rows, large_peak = self.export_peak(2500)
+        self.assertEqual((small_rows, large_rows), (400, 10000))
+        self.assertLess(large_peak, 2 * small_peak)
+
+    async def test_asgi_export_is_streamed_asynchronously(self):
+        election = await sync_to_async(seed_election)(2, 4, voters=60)
+        token = await Token.objects.acreate(user=self.admin)
+        response = await AsyncClient().get(
+            f'/api/elections/{election.pk}/export/votes/', {'output': 'ndjson'},
+            headers={'Authorization': f'Token {token.key}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(sum(chunk.count(b'\n') for chunk in chunks), 120)
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = io.StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertNotIn('full scan', out.getvalue())
+
+
+@override_settings(ELECTION_RESPONSE_MAX_AGE=0)
+class TallyTests(TestCase):
+    """
+    The running tallies and the cached results follow every write to the votes
+    """
+    def setUp(self):
+        election_cache().clear()
+        self.election = seed_election(2, 3, voters=0, whitelisted=1)
+        voter = VoterElectionWhitelist.objects.get(election=self.election).voter
+        self.wallet = voter.wallet_address
+        self.client = APIClient()
+        self.client.force_authenticate(voter)
+        self.candidates = list(Candidate.objects.filter(election=self.election).order_by('position', 'pk'))
+        # Cache the empty results, which a missed invalidation would keep serving
+        self.client.get(f'/api/elections/{self.election.pk}/results/')
+
+    def write(self, method, url, data=None):
+        version = get_election_version(self.election.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 300)
+        self.assertNotEqual(get_election_version(self.election.pk), version)
+        self.assertTallied()
+        return response
+
+    def assertTallied(self):
+        self.assertEqual(verify_tallies(self.election), [])
+        results = self.client.get(f'/api/elections/{self.election.pk}/results/').data
+        self.assertEqual(results, count_votes(self.election))
+
+    def vote(self, candidate):
+        return self.write('post', '/api/votes/', {
+            'election': self.election.pk,
+            'position': candidate.position_id,
+            'candidate': candidate.pk,
+            'wallet': self.wallet,
+        })
+
+    def test_create(self):
+        self.vote(self.candidates[0])
+        self.assertEqual(VoteTally.objects.get(candidate=self.candidates[0]).votes, 1)
+
+    def test_ballot(self):
+        first, second = self.candidates[0], self.candidates[-1]
+        self.write('post', '/api/votes/ballot/', {
+            'election': self.election.pk,
+            'wallet': self.wallet,
+            'selections': [
+                {'position': first.position_id, 'candidate': first.pk},
+                {'position': second.position_id, 'candidate': second.pk},
+            ],
+        })
+        self.assertEqual(Vote.objects.filter(election=self.election).count(), 2)
+
+    def test_patch_moves_the_vote(self):
+        vote_id = self.vote(self.candidates[0]).data['id']
+        self.write('patch', f'/api/votes/{vote_id}/', {'candidate': self.candidates[1].pk})
+        self.assertEqual(VoteTally.objects.get(candidate=self.candidates[0]).votes, 0)
+        self.assertEqual(VoteTally.objects.get(candidate=self.candidates[1]).votes, 1)
+
+    def test_delete(self):
+        vote_id = self.vote(self.candidates[0]).data['id']
+        self.write('delete', f'/api/votes/{vote_id}/')
+        self.assertEqual(VoteTally.objects.get(candidate=self.candidates[0]).votes, 0)
+
+    def test_rebuild_repairs_counters(self):
+        self.vote(self.candidates[0])
+        VoteTally.objects.filter(election=self.election).update(votes=5)
+        self.assertNotEqual(verify_tallies(self.election), [])
+        version = get_election_version(self.election.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild_tallies(self.election)
+        self.assertNotEqual(get_election_version(self.election.pk), version)
+        self.assertTallied()
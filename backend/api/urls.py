@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     RegisterView, LoginView, UserDetailView, UpdateWalletView,
     UserProfileUpdateView, UserVotesView,
-    ElectionViewSet, CandidateViewSet, PartyViewSet, VoteViewSet, VoterViewSet, ElectoralRollViewSet
+    ElectionViewSet, CandidateViewSet, PartyViewSet, VoteViewSet, VoterViewSet, ElectoralRollViewSet,
+    election_results_stream, vote_submit
 )
 
 # Create a router and register viewsets
@@ -27,5 +28,7 @@ auth_urls = [
 
 urlpatterns = [
     path('auth/', include(auth_urls)),
+    path('elections/<int:pk>/results/stream/', election_results_stream, name='election-results-stream'),
+    path('votes/submit/', vote_submit, name='vote-submit'),
     path('', include(router.urls)),
 ]
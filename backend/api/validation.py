@@ -0,0 +1,117 @@
+"""
+Vote validation
+
+The election's status, voting window and which position each candidate runs
+for come from the in-process election metadata cache (api/metadata.py). A
+vote is then checked with one query against the election row, with Exists()
+subqueries for the voter's whitelisting and an earlier vote for the same
+position.
+"""
+from django.db.models import Exists, OuterRef
+
+from .blockchain.contracts import address_variants
+from .metadata import election_metadata
+from .models import Election, Vote, VoterElectionWhitelist
+
+ALREADY_VOTED = "You have already voted for this position in this election"
+NOT_WHITELISTED = "This wallet is not whitelisted for this election"
+
+
+def normalize_wallet(wallet):
+    """
+    Votes are stored under the lowercase address, as the chain indexer stores them
+    """
+    return wallet.lower()
+
+
+def wallet_variants(wallet):
+    try:
+        return address_variants(wallet) | {wallet}
+    except ValueError:
+        return {wallet}
+
+
+def _election_row(election_id, wallet, **annotations):
+    return (
+        Election.objects.filter(pk=election_id)
+        .annotate(
+            whitelisted=Exists(VoterElectionWhitelist.objects.filter(
+                election=OuterRef('pk'), is_whitelisted=True, voter__wallet_address__in=wallet_variants(wallet),
+            )),
+            **annotations,
+        )
+        .values('whitelisted', *annotations)
+        .first()
+    )
+
+
+def _candidate_problem(candidates, position_id, candidate_id):
+    position = candidates.get(candidate_id)
+    if position is None:
+        return "Candidate does not belong to this election"
+    if position != position_id:
+        return "Candidate does not belong to this position"
+    return None
+
+
+def vote_problem(election_id, position_id, candidate_id, wallet, exclude_vote=None):
+    """
+    Why `wallet` may not vote for a candidate, or None if it may.
+    `exclude_vote` is the vote being edited, if any.
+    """
+    metadata = election_metadata(election_id)
+    if metadata is None:
+        return "Election not found"
+    problem = (
+        _candidate_problem(metadata.candidate_positions, position_id, candidate_id)
+        or metadata.voting_problem()
+    )
+    if problem:
+        return problem
+
+    # Also matches votes stored under another spelling of the address
+    earlier_votes = Vote.objects.filter(
+        election=OuterRef('pk'), position=position_id, wallet__in=wallet_variants(wallet),
+    )
+    if exclude_vote is not None:
+        earlier_votes = earlier_votes.exclude(pk=exclude_vote)
+    election = _election_row(election_id, wallet, already_voted=Exists(earlier_votes))
+
+    if not election['whitelisted']:
+        return NOT_WHITELISTED
+    if election['already_voted']:
+        return ALREADY_VOTED
+    return None
+
+
+def ballot_problems(election_id, wallet, selections):
+    """
+    Why `wallet` may not cast a ballot of ``(position pk, candidate pk)``
+    selections: a problem with the ballot as a whole or None, and a
+    ``{position pk: problem}`` dict for the selections. Two queries whatever
+    the number of selections.
+    """
+    metadata = election_metadata(election_id)
+    if metadata is None:
+        return "Election not found", {}
+    problem = metadata.voting_problem()
+    if problem:
+        return problem, {}
+    if not _election_row(election_id, wallet)['whitelisted']:
+        return NOT_WHITELISTED, {}
+
+    problems = {}
+    positions = set()
+    for position_id, candidate_id in selections:
+        if position_id in positions:
+            problems[position_id] = "Position selected more than once"
+            continue
+        positions.add(position_id)
+        problem = _candidate_problem(metadata.candidate_positions, position_id, candidate_id)
+        if problem:
+            problems[position_id] = problem
+
+    voted = Vote.objects.filter(election_id=election_id, wallet__in=wallet_variants(wallet), position_id__in=positions)
+    for position_id in voted.values_list('position_id', flat=True):
+        problems.setdefault(position_id, ALREADY_VOTED)
+    return None, problems
@@ -0,0 +1,162 @@
+"""
+Verification of submitted vote transaction hashes
+
+Votes are stored as submitted and enter the queue as `pending`. A worker
+(`manage.py verify_votes`) later fetches their transaction receipts in
+batches through the shared RPC client and checks that the transaction emitted
+a matching VoteCast event on the election's contract:
+
+- confirmed: a VoteCast for the same voter, position and candidate, at least
+  BLOCKCHAIN_CONFIRMATIONS blocks deep
+- mismatched: the transaction reverted, or emitted no matching VoteCast
+- missing: no transaction hash, or no receipt once VOTE_VERIFICATION_GRACE has passed
+"""
+import asyncio
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from web3 import Web3
+
+from .blockchain.contracts import load_abi
+from .blockchain.rpc import get_client, run_sync
+from .models import Vote
+
+TRANSACTION_HASH = re.compile(r'^0x[0-9a-fA-F]{64}$')
+
+VERIFICATION_FIELDS = (
+    'id', 'wallet', 'transaction_hash', 'timestamp',
+    'election__contract_address', 'position__position_id', 'candidate__candidate_id',
+)
+
+
+def _vote_cast_event():
+    return Web3().eth.contract(abi=load_abi('Election')).events.VoteCast()
+
+
+def pending_votes():
+    """
+    Votes waiting for verification whose election has a contract to check against
+    """
+    return (
+        Vote.objects.filter(verification_status='pending')
+        .exclude(election__contract_address__isnull=True)
+        .exclude(election__contract_address='')
+    )
+
+
+async def _fetch(hashes):
+    client = get_client()
+    head, *receipts = await asyncio.gather(
+        client.block_number(),
+        *(client.get_transaction_receipt(transaction_hash) for transaction_hash in hashes),
+    )
+    return head, dict(zip(hashes, receipts))
+
+
+def check_vote(vote, receipt, event, safe_block, expires):
+    """
+    Verification status of a vote (a dict of VERIFICATION_FIELDS) given its
+    receipt, with its block number when confirmed. None means still pending.
+    """
+    if receipt is None:
+        return ('missing', None) if vote['timestamp'] < expires else None
+    if receipt['blockNumber'] > safe_block:
+        return None
+    if receipt['status'] != 1:
+        return 'mismatched', None
+
+    contract = vote['election__contract_address'].lower()
+    for log in receipt['logs']:
+        if log['address'].lower() != contract or not log['topics'] or Web3.to_hex(log['topics'][0]) != event.topic:
+            continue
+        args = event.process_log(log)['args']
+        if (args['voter'].lower() == vote['wallet'].lower()
+                and args['positionId'] == vote['position__position_id']
+                and args['candidateId'] == vote['candidate__candidate_id']):
+            return 'confirmed', receipt['blockNumber']
+    return 'mismatched', None
+
+
+def _verify_batch(votes, event, confirmations, expires, stats):
+    hashes = sorted({
+        vote['transaction_hash'].lower() for vote in votes
+        if vote['transaction_hash'] and TRANSACTION_HASH.match(vote['transaction_hash'])
+    })
+    head, receipts = run_sync(_fetch(hashes)) if hashes else (None, {})
+    safe_block = head - confirmations if head is not None else None
+
+    now = timezone.now()
+    verified = []
+    for vote in votes:
+        transaction_hash = (vote['transaction_hash'] or '').lower()
+        if transaction_hash not in receipts:
+            # No hash, or not a transaction hash at all
+            result = ('missing', None)
+        else:
+            result = check_vote(vote, receipts[transaction_hash], event, safe_block, expires)
+
+        if result is None:
+            stats['pending'] += 1
+            continue
+        verification_status, block_number = result
+        stats[verification_status] += 1
+        verified.append(Vote(
+            pk=vote['id'], verification_status=verification_status, verified_at=now, block_number=block_number,
+        ))
+
+    confirmed = [vote for vote in verified if vote.verification_status == 'confirmed']
+    Vote.objects.bulk_update(confirmed, ['verification_status', 'verified_at', 'block_number'], batch_size=1000)
+    Vote.objects.bulk_update(
+        [vote for vote in verified if vote.verification_status != 'confirmed'],
+        ['verification_status', 'verified_at'],
+        batch_size=1000,
+    )
+
+
+def verify_pending_votes(batch_size=None, confirmations=None, grace=None):
+    """
+    Check every pending vote once, `batch_size` receipts at a time.
+    Returns counts per outcome; votes left pending are counted as 'pending'.
+    """
+    batch_size = batch_size or settings.VOTE_VERIFICATION_BATCH_SIZE
+    confirmations = settings.BLOCKCHAIN_CONFIRMATIONS if confirmations is None else confirmations
+    grace = settings.VOTE_VERIFICATION_GRACE if grace is None else grace
+    expires = timezone.now() - timedelta(seconds=grace)
+    event = _vote_cast_event()
+
+    stats = Counter()
+    last_id = 0
+    while True:
+        votes = list(
+            pending_votes().filter(id__gt=last_id).order_by('id').values(*VERIFICATION_FIELDS)[:batch_size]
+        )
+        if not votes:
+            break
+        _verify_batch(votes, event, confirmations, expires, stats)
+        last_id = votes[-1]['id']
+    return stats
+
+
+def verification_metrics(votes=None):
+    """
+    Vote counts per verification status and the age of the backlog
+    """
+    votes = Vote.objects.all() if votes is None else votes
+    counts = {value: 0 for value, _ in Vote.VERIFICATION_STATUS}
+    for row in votes.values('verification_status').annotate(total=Count('id')).order_by():
+        counts[row['verification_status']] = row['total']
+
+    pending = votes.filter(verification_status='pending').aggregate(oldest=Min('timestamp'))
+    last_verified_at = votes.aggregate(last=Max('verified_at'))['last']
+    oldest_pending_age = (timezone.now() - pending['oldest']).total_seconds() if pending['oldest'] else None
+
+    return {
+        "counts": counts,
+        "backlog": counts['pending'],
+        "oldest_pending_age": oldest_pending_age,
+        "last_verified_at": last_verified_at,
+    }
@@ -2,14 +2,38 @@ from rest_framework import viewsets, permissions, status, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from .models import User, Election, Position, Candidate, Party, Vote, VoterElectionWhitelist, ElectoralRoll
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.db import transaction
+from django.db.models import Prefetch, OuterRef, Subquery, Count, Sum
+from django.db.models.functions import Coalesce
+import csv
+import json
+from web3.exceptions import Web3Exception
+from .models import User, Election, Position, Candidate, Party, Vote, VoterElectionWhitelist, ElectoralRoll, VoteTally
 from .serializers import (
-    UserSerializer, RegisterSerializer, LoginSerializer, ElectionSerializer,
-    PositionSerializer, CandidateSerializer, PartySerializer, VoteSerializer, VoterElectionWhitelistSerializer, ElectoralRollSerializer
+    UserSerializer, RegisterSerializer, LoginSerializer, ElectionSerializer, ElectionSummarySerializer,
+    PositionSerializer, CandidateSerializer, PartySerializer, VoteSerializer, VoterElectionWhitelistSerializer, ElectoralRollSerializer,
+    BallotSerializer
 )
+from .tally import tally_election, record_votes, remove_votes
+from .cache import cached_response, invalidate_election
+from .whitelist import resolve_voters, whitelist_voters, unwhitelist_voters, MAX_BULK_WHITELIST
+from .imports import import_electoral_roll, read_csv, DEFAULT_IMPORT_BATCH_SIZE, MAX_IMPORT_BATCH_SIZE
+from .exports import stream_export, EXPORT_FORMATS, VOTE_EXPORT_FIELDS, ELECTORAL_ROLL_EXPORT_FIELDS
+from .blockchain.snapshot import results_snapshot
+from .verification import verification_metrics
+from .live import results_events
+from .ingest import submit_vote, write_ballot, VoteRejected
+from .metadata import election_metadata, metadata_cache
+from .roll import on_roll, roll_members, MAX_BULK_VERIFY
+from .validation import wallet_variants
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
@@ -23,6 +47,20 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         # Write permissions are only allowed to admin users
         return request.user and request.user.is_admin
 
+def per_election(queryset, aggregate):
+    """
+    Correlated subquery computing `aggregate` over the rows of `queryset`
+    belonging to the outer election, 0 when there are none
+    """
+    subquery = (
+        queryset.filter(election=OuterRef('pk'))
+        .order_by()
+        .values('election')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Coalesce(Subquery(subquery), 0)
+
 class RegisterView(APIView):
     """
     API endpoint for user registration
@@ -130,7 +168,7 @@ class UserVotesView(APIView):
             )
 
         # Get votes associated with this wallet address
-        votes = Vote.objects.filter(wallet=wallet_address)
+        votes = Vote.objects.filter(wallet__in=wallet_variants(wallet_address)).select_related('election', 'position', 'candidate')
 
         # Enhance the data with election and candidate names
         result = []
@@ -158,6 +196,39 @@ class ElectionViewSet(viewsets.ModelViewSet):
     serializer_class = ElectionSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
 
+    def is_summary(self):
+        """
+        `/api/elections/?view=summary` lists elections without nested data
+        """
+        return self.action == 'list' and self.request.query_params.get('view') == 'summary'
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return ElectionSummarySerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = Election.objects.all()
+        if self.is_summary():
+            queryset = queryset.annotate(
+                position_count=per_election(Position.objects.all(), Count('pk')),
+                candidate_count=per_election(Candidate.objects.all(), Count('pk')),
+                whitelist_count=per_election(VoterElectionWhitelist.objects.filter(is_whitelisted=True), Count('pk')),
+                votes_cast=per_election(VoteTally.objects.all(), Sum('votes')),
+            )
+        elif self.action in ('list', 'retrieve'):
+            # Load everything ElectionSerializer renders in a fixed number of queries
+            queryset = queryset.prefetch_related(
+                Prefetch('positions', queryset=Position.objects.prefetch_related('candidates')),
+                Prefetch('candidates', queryset=Candidate.objects.select_related('party')),
+                Prefetch(
+                    'whitelisted_voters',
+                    queryset=VoterElectionWhitelist.objects.filter(is_whitelisted=True).select_related('voter', 'election'),
+                    to_attr='whitelisted_entries',
+                ),
+            )
+        return queryset
+
     def create(self, request, *args, **kwargs):
 
         print("\n=== Create Election Request ===")
@@ -196,15 +267,34 @@ class ElectionViewSet(viewsets.ModelViewSet):
         print("Election Updated Successfully")
         return Response(serializer.data)
 
+    def get_metadata(self):
+        """
+        Cached metadata of the requested election, for endpoints that only need its ID
+        """
+        try:
+            metadata = election_metadata(int(self.kwargs['pk']))
+        except ValueError:
+            metadata = None
+        if metadata is None:
+            raise Http404("No Election matches the given query.")
+        return metadata
+
+    def retrieve(self, request, *args, **kwargs):
+        election_id = self.get_metadata().election_id
+        return cached_response(request, election_id, 'detail', lambda: self.get_serializer(self.get_object()).data)
+
     @action(detail=True, methods=['get'])
     def candidates(self, request, pk=None):
         """
         Get all candidates for a specific election
         """
-        election = self.get_object()
-        candidates = Candidate.objects.filter(election=election)
-        serializer = CandidateSerializer(candidates, many=True)
-        return Response(serializer.data)
+        election_id = self.get_metadata().election_id
+
+        def build():
+            candidates = Candidate.objects.filter(election_id=election_id)
+            return CandidateSerializer(candidates, many=True).data
+
+        return cached_response(request, election_id, 'candidates', build)
 
     @action(detail=True, methods=['post'])
     def whitelist(self, request, pk=None):
@@ -240,6 +330,61 @@ class ElectionViewSet(viewsets.ModelViewSet):
         except User.DoesNotExist:
             return Response({"error": "No user found with this wallet address"}, status=status.HTTP_404_NOT_FOUND)
         
+    def _bulk_voters(self, request):
+        """
+        Resolve the `wallet_addresses` and `student_ids` lists of a bulk whitelist request.
+        Returns (election, user_ids, report) or an error Response.
+        """
+        if not request.user.is_admin:
+            return Response({"error": "Admin access required"}, status=status.HTTP_403_FORBIDDEN)
+
+        wallet_addresses = request.data.get('wallet_addresses') or []
+        student_ids = request.data.get('student_ids') or []
+        if not isinstance(wallet_addresses, list) or not isinstance(student_ids, list):
+            return Response({"error": "wallet_addresses and student_ids must be lists"}, status=status.HTTP_400_BAD_REQUEST)
+        if not wallet_addresses and not student_ids:
+            return Response({"error": "Wallet addresses or student IDs are required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(wallet_addresses) + len(student_ids) > MAX_BULK_WHITELIST:
+            return Response(
+                {"error": f"At most {MAX_BULK_WHITELIST} voters can be processed per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        election = self.get_object()
+        user_ids, unknown_wallets, unknown_student_ids = resolve_voters(
+            election, [str(w) for w in wallet_addresses], [str(s) for s in student_ids]
+        )
+        report = {"unknown_wallets": unknown_wallets, "unknown_student_ids": unknown_student_ids}
+        return election, user_ids, report
+
+    @action(detail=True, methods=['post'], url_path='whitelist/bulk')
+    def whitelist_bulk(self, request, pk=None):
+        """
+        Whitelist many voters for this election, by wallet address and/or student ID
+        Admin only
+        """
+        resolved = self._bulk_voters(request)
+        if isinstance(resolved, Response):
+            return resolved
+
+        election, user_ids, report = resolved
+        report['whitelisted'], report['already_whitelisted'] = whitelist_voters(election, user_ids)
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='unwhitelist/bulk')
+    def unwhitelist_bulk(self, request, pk=None):
+        """
+        Remove many voters from this election's whitelist, by wallet address and/or student ID
+        Admin only
+        """
+        resolved = self._bulk_voters(request)
+        if isinstance(resolved, Response):
+            return resolved
+
+        election, user_ids, report = resolved
+        report['unwhitelisted'] = unwhitelist_voters(election, user_ids)
+        return Response(report, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['patch'])
     def update_contract_address(self, request, pk=None):
         """
@@ -292,31 +437,39 @@ class ElectionViewSet(viewsets.ModelViewSet):
         Get election results by position
         """
         print(f"Fetching results for election ID: {pk}")
-        election = self.get_object()
+        election = Election(pk=self.get_metadata().election_id)
 
         # Organize votes by position and candidate
-        result_data = {}
-        positions = Position.objects.filter(election=election)
+        return cached_response(request, election.pk, 'results', lambda: tally_election(election))
 
-        for position in positions:
-            candidates = Candidate.objects.filter(position=position)
-            position_votes = []
+    @action(detail=False, methods=['get'], url_path='metadata-cache')
+    def metadata_cache_stats(self, request):
+        """
+        Hit/miss counters of this process's election metadata cache
+        Admin only
+        """
+        if not request.user.is_admin:
+            return Response({"error": "Admin access required"}, status=status.HTTP_403_FORBIDDEN)
 
-            for candidate in candidates:
-                vote_count = Vote.objects.filter(
-                    election=election,
-                    position=position,
-                    candidate=candidate
-                ).count()
+        return Response(metadata_cache.info())
+
+    @action(detail=True, methods=['get'], url_path='chain-results')
+    def chain_results(self, request, pk=None):
+        """
+        Get election results read from the election contract, as of the latest block
+        """
+        election = self.get_object()
+        if not election.contract_address:
+            return Response({"error": "Election has no contract address"}, status=status.HTTP_400_BAD_REQUEST)
 
-                position_votes.append({
-                    'candidateId': candidate.candidate_id,
-                    'votes': vote_count
-                })
+        try:
+            snapshot = results_snapshot(election)
+        except (Web3Exception, OSError) as e:
+            print(f"Error reading results from the chain: {str(e)}")
+            return Response({"error": "Could not read results from the blockchain"}, status=status.HTTP_502_BAD_GATEWAY)
 
-            result_data[position.position_id] = position_votes
+        return Response(snapshot, headers={'Cache-Control': 'private, no-cache'})
 
-        return Response(result_data)
     @action(detail=True, methods=['get'])
     def votes(self, request, pk=None):
         """
@@ -324,9 +477,47 @@ class ElectionViewSet(viewsets.ModelViewSet):
         """
         election = self.get_object()
         votes = Vote.objects.filter(election=election)
+
+        page = self.paginate_queryset(votes)
+        if page is not None:
+            return self.get_paginated_response(VoteSerializer(page, many=True).data)
+
         serializer = VoteSerializer(votes, many=True)
         return Response(serializer.data)
 
+    def _export(self, request, queryset, fields, name):
+        if not request.user.is_admin:
+            return Response({"error": "Admin access required"}, status=status.HTTP_403_FORBIDDEN)
+
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Invalid output, expected one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return stream_export(queryset, fields, output, name, asynchronous=isinstance(request._request, ASGIRequest))
+
+    @action(detail=True, methods=['get'], url_path='export/votes')
+    def export_votes(self, request, pk=None):
+        """
+        Stream all votes of an election as CSV or NDJSON (?output=csv|ndjson)
+        Admin only
+        """
+        election = self.get_object()
+        votes = Vote.objects.filter(election=election)
+        return self._export(request, votes, VOTE_EXPORT_FIELDS, f"election-{election.id}-votes")
+
+    @action(detail=True, methods=['get'], url_path='export/electoral-roll')
+    def export_electoral_roll(self, request, pk=None):
+        """
+        Stream the electoral roll of an election as CSV or NDJSON (?output=csv|ndjson)
+        Admin only
+        """
+        election = self.get_object()
+        roll = ElectoralRoll.objects.filter(election=election)
+        return self._export(request, roll, ELECTORAL_ROLL_EXPORT_FIELDS, f"election-{election.id}-electoral-roll")
+
 class CandidateViewSet(viewsets.ModelViewSet):
     """
     API endpoints for candidate management
@@ -385,12 +576,88 @@ class ElectoralRollViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        is_verified = ElectoralRoll.objects.filter(
-            election_id=election_id,
-            student_id=student_id
-        ).exists()
+        try:
+            election_id = int(election_id)
+        except ValueError:
+            return Response({"error": "election_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"isVerified": on_roll(election_id, student_id)})
+
+    @action(detail=False, methods=['post'], url_path='verify/bulk')
+    def verify_bulk(self, request):
+        """
+        Verify many students against the electoral roll of an election at once
+        Admin only
+        """
+        election_id = request.data.get('election_id')
+        student_ids = request.data.get('student_ids')
+
+        if not election_id or not student_ids:
+            return Response(
+                {"error": "Both election_id and student_ids are required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not isinstance(student_ids, list):
+            return Response({"error": "student_ids must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(student_ids) > MAX_BULK_VERIFY:
+            return Response(
+                {"error": f"At most {MAX_BULK_VERIFY} student IDs can be verified per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            election_id = int(election_id)
+        except (TypeError, ValueError):
+            return Response({"error": "election_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        student_ids = [str(student_id) for student_id in student_ids]
+        members = roll_members(election_id, student_ids)
+        return Response({
+            "results": {student_id: student_id in members for student_id in student_ids},
+            "verified": len(members),
+        })
+
+    @action(detail=False, methods=['post'], url_path='bulk-import', parser_classes=[JSONParser, MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Import many electoral roll entries for an election at once
+        Accepts a CSV upload (`file`, with student_id,first_name,last_name columns)
+        or a JSON body {"election": id, "entries": [...]}
+        """
+        data = request.data if isinstance(request.data, dict) else {}
+        election_id = data.get('election') or request.query_params.get('election')
+        if not election_id:
+            return Response({"error": "Election ID is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            election_id = int(election_id)
+        except (TypeError, ValueError):
+            return Response({"error": "election must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        election = get_object_or_404(Election, id=election_id)
+
+        try:
+            batch_size = int(data.get('batch_size') or request.query_params.get('batch_size') or DEFAULT_IMPORT_BATCH_SIZE)
+        except (TypeError, ValueError):
+            return Response({"error": "batch_size must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        batch_size = max(1, min(batch_size, MAX_IMPORT_BATCH_SIZE))
+
+        if 'file' in request.FILES:
+            rows = read_csv(request.FILES['file'])
+        elif isinstance(request.data, list):
+            rows = request.data
+        elif isinstance(data.get('entries'), list):
+            rows = data['entries']
+        else:
+            return Response(
+                {"error": "Provide a CSV file or a list of entries"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            report = import_electoral_roll(election, rows, batch_size=batch_size)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            return Response({"error": f"Could not read CSV file: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({"isVerified": is_verified})
+        return Response(report, status=status.HTTP_200_OK)
 
 class VoteViewSet(viewsets.ModelViewSet):
     """
@@ -415,6 +682,80 @@ class VoteViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+    def perform_create(self, serializer):
+        # Persist the vote and its running tally in one transaction
+        with transaction.atomic():
+            vote = serializer.save()
+            record_votes([vote])
+            invalidate_election(vote.election_id)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            remove_votes([serializer.instance])
+            invalidate_election(serializer.instance.election_id)
+            # An edited vote has to be verified again
+            vote = serializer.save(verification_status='pending', verified_at=None)
+            record_votes([vote])
+            invalidate_election(vote.election_id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            remove_votes([instance])
+            instance.delete()
+            invalidate_election(instance.election_id)
+
+    @action(detail=False, methods=['post'])
+    def ballot(self, request):
+        """
+        Cast the votes of a whole ballot at once
+        Either every selection is stored or none is
+        """
+        serializer = BallotSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ballot = serializer.validated_data
+
+        # Every vote of the ballot shares its transaction hash
+        votes = [
+            Vote(
+                election_id=ballot['election'],
+                position_id=selection['position'],
+                candidate_id=selection['candidate'],
+                wallet=ballot['wallet'],
+                transaction_hash=ballot.get('transaction_hash') or None,
+            )
+            for selection in ballot['selections']
+        ]
+        try:
+            write_ballot(votes)
+        except VoteRejected as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "election": ballot['election'],
+            "wallet": ballot['wallet'],
+            "votes": VoteSerializer(votes, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def verification(self, request):
+        """
+        Get transaction hash verification counts and backlog, optionally for one election
+        Admin only
+        """
+        if not request.user.is_admin:
+            return Response({"error": "Admin access required"}, status=status.HTTP_403_FORBIDDEN)
+
+        votes = Vote.objects.all()
+        election_id = request.query_params.get('election')
+        if election_id:
+            try:
+                election_id = int(election_id)
+            except ValueError:
+                return Response({"error": "election must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            votes = votes.filter(election=get_object_or_404(Election, pk=election_id))
+
+        return Response(verification_metrics(votes))
+
 class VoterViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoints for voter management
@@ -441,7 +782,14 @@ class VoterViewSet(viewsets.ReadOnlyModelViewSet):
 
         try:
             election = Election.objects.get(id=election_id)
-            whitelisted_voters = VoterElectionWhitelist.objects.filter(election=election, is_whitelisted=True)
+            whitelisted_voters = VoterElectionWhitelist.objects.filter(
+                election=election, is_whitelisted=True
+            ).select_related('voter', 'election')
+
+            page = self.paginate_queryset(whitelisted_voters)
+            if page is not None:
+                return self.get_paginated_response(VoterElectionWhitelistSerializer(page, many=True).data)
+
             serializer = VoterElectionWhitelistSerializer(whitelisted_voters, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Election.DoesNotExist:
@@ -456,6 +804,70 @@ class VoterViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Get the election whitelist for all voters
         """
-        whitelists = VoterElectionWhitelist.objects.filter(is_whitelisted=True)
+        whitelists = VoterElectionWhitelist.objects.filter(is_whitelisted=True).select_related('voter', 'election')
+
+        page = self.paginate_queryset(whitelists)
+        if page is not None:
+            return self.get_paginated_response(VoterElectionWhitelistSerializer(page, many=True).data)
+
         serializer = VoterElectionWhitelistSerializer(whitelists, many=True)
-        return Response(serializer.data, status=200)
\ No newline at end of file
+        return Response(serializer.data, status=200)
+
+
+async def _token_user(request, allow_query=False):
+    """
+    User of the DRF token in the Authorization header, or in the `token` query
+    parameter when `allow_query` is set
+    """
+    key = request.GET.get('token') if allow_query else None
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Token '):
+        key = header[len('Token '):]
+    if not key:
+        return None
+    token = await Token.objects.select_related('user').filter(key=key).afirst()
+    return token.user if token and token.user.is_active else None
+
+
+async def election_results_stream(request, pk):
+    """
+    Server-sent events stream of an election's results: a `snapshot` event,
+    then a `delta` event with the changed candidates whenever votes are recorded.
+    EventSource cannot send headers, so the token may be passed as `?token=`.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Live results require an ASGI server"}, status=status.HTTP_501_NOT_IMPLEMENTED)
+    if await _token_user(request, allow_query=True) is None:
+        return JsonResponse({"error": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+    if not await Election.objects.filter(pk=pk).aexists():
+        return JsonResponse({"error": "Election not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    response = StreamingHttpResponse(results_events(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def vote_submit(request):
+    """
+    Submit a vote without tying up a worker thread while it is validated.
+    Same body and response as creating a vote through /api/votes/, with one
+    read to validate it and one transaction to store it.
+    """
+    if await _token_user(request) is None:
+        return JsonResponse({"error": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON"}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Expected a JSON object"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        vote = await submit_vote(data)
+    except VoteRejected as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return JsonResponse(VoteSerializer(vote).data, status=status.HTTP_201_CREATED)
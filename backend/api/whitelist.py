@@ -0,0 +1,81 @@
+"""
+Bulk voter whitelisting for elections
+
+Voters are resolved with one query, and whitelist rows are upserted with a
+single `bulk_create(update_conflicts=True)` rather than per-voter
+get_or_create/save round trips.
+"""
+from django.db import transaction
+
+from .cache import invalidate_election
+from .models import User, VoterElectionWhitelist, ElectoralRoll
+
+MAX_BULK_WHITELIST = 50000
+
+
+def resolve_voters(election, wallet_addresses=(), student_ids=()):
+    """
+    Map wallet addresses and student IDs to user IDs in one query.
+
+    Student IDs only resolve when the student is on the election's electoral
+    roll. Returns ``(user_ids, unknown_wallets, unknown_student_ids)``.
+    """
+    wallet_addresses = set(wallet_addresses)
+    student_ids = set(student_ids)
+
+    users = User.objects.none()
+    if wallet_addresses:
+        users = users | User.objects.filter(wallet_address__in=wallet_addresses)
+    if student_ids:
+        on_roll = ElectoralRoll.objects.filter(election=election, student_id__in=student_ids).values('student_id')
+        users = users | User.objects.filter(student_id__in=on_roll)
+
+    user_ids = set()
+    found_wallets = set()
+    found_students = set()
+    for user_id, wallet_address, student_id in users.values_list('id', 'wallet_address', 'student_id'):
+        user_ids.add(user_id)
+        found_wallets.add(wallet_address)
+        found_students.add(student_id)
+
+    return user_ids, sorted(wallet_addresses - found_wallets), sorted(student_ids - found_students)
+
+
+def whitelist_voters(election, user_ids):
+    """
+    Whitelist the given users for an election.
+    Returns ``(newly_whitelisted, already_whitelisted)`` counts.
+    """
+    already = set(
+        VoterElectionWhitelist.objects.filter(election=election, voter_id__in=user_ids, is_whitelisted=True)
+        .values_list('voter_id', flat=True)
+    )
+    entries = [
+        VoterElectionWhitelist(voter_id=user_id, election=election, is_whitelisted=True)
+        for user_id in user_ids if user_id not in already
+    ]
+
+    with transaction.atomic():
+        VoterElectionWhitelist.objects.bulk_create(
+            entries,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['voter', 'election'],
+            update_fields=['is_whitelisted'],
+        )
+        invalidate_election(election.id)
+
+    return len(entries), len(already)
+
+
+def unwhitelist_voters(election, user_ids):
+    """
+    Remove the given users from an election's whitelist.
+    Returns the number of voters that were whitelisted.
+    """
+    with transaction.atomic():
+        removed = VoterElectionWhitelist.objects.filter(
+            election=election, voter_id__in=user_ids, is_whitelisted=True
+        ).update(is_whitelisted=False)
+        invalidate_election(election.id)
+    return removed
@@ -74,6 +74,36 @@ DATABASES = {
     }
 }
 
+# Cache
+# Election responses are cached per election version (see api/cache.py).
+# The local-memory backend is per process; use 'file' or 'db' when running
+# several worker processes ('db' needs `python manage.py createcachetable`).
+ELECTION_CACHE_BACKEND = os.getenv('ELECTION_CACHE_BACKEND', 'locmem')
+ELECTION_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'trustvote-elections',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('ELECTION_CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'trustvote_cache',
+    },
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'elections': ELECTION_CACHE_BACKENDS[ELECTION_CACHE_BACKEND],
+}
+ELECTION_CACHE_ALIAS = 'elections'
+ELECTION_CACHE_TIMEOUT = int(os.getenv('ELECTION_CACHE_TIMEOUT', '300'))  # Seconds
+ELECTION_RESPONSE_MAX_AGE = int(os.getenv('ELECTION_RESPONSE_MAX_AGE', '5'))  # Seconds a cached response and its ETag are served before being rebuilt, 0 to keep them until the version changes
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -114,7 +144,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Opt-in cursor pagination, see api/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CursorPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', '100')),
 }
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '1000'))
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = False  # In development, allow all origins
@@ -146,3 +180,33 @@ CORS_ALLOW_HEADERS = [
 # Blockchain settings
 BLOCKCHAIN_PROVIDER_URL = os.getenv('BLOCKCHAIN_PROVIDER_URL', 'http://localhost:7545')  # Default to Ganache
 ELECTION_FACTORY_ADDRESS = os.getenv('ELECTION_FACTORY_ADDRESS', '')
+CONTRACTS_ABI_DIR = Path(os.getenv('CONTRACTS_ABI_DIR', BASE_DIR.parent / 'frontend' / 'src' / 'contracts'))  # Truffle artifacts
+BLOCKCHAIN_CONFIRMATIONS = int(os.getenv('BLOCKCHAIN_CONFIRMATIONS', '12'))  # Blocks before an event is indexed
+BLOCKCHAIN_LOG_BATCH_SIZE = int(os.getenv('BLOCKCHAIN_LOG_BATCH_SIZE', '2000'))  # Blocks per eth_getLogs call
+BLOCKCHAIN_RPC_BATCH_SIZE = int(os.getenv('BLOCKCHAIN_RPC_BATCH_SIZE', '100'))  # Requests per JSON-RPC batch
+BLOCKCHAIN_RPC_BATCH_DELAY = float(os.getenv('BLOCKCHAIN_RPC_BATCH_DELAY', '0.005'))  # Seconds to gather requests into a batch
+BLOCKCHAIN_RPC_MAX_CONCURRENCY = int(os.getenv('BLOCKCHAIN_RPC_MAX_CONCURRENCY', '8'))  # Open HTTP requests per endpoint
+BLOCKCHAIN_RPC_RETRIES = int(os.getenv('BLOCKCHAIN_RPC_RETRIES', '3'))
+BLOCKCHAIN_RPC_BACKOFF = float(os.getenv('BLOCKCHAIN_RPC_BACKOFF', '0.25'))  # Seconds before the first retry, doubled after each
+BLOCKCHAIN_RPC_TIMEOUT = float(os.getenv('BLOCKCHAIN_RPC_TIMEOUT', '10'))  # Seconds per HTTP request
+CHAIN_HEAD_CACHE_TIMEOUT = int(os.getenv('CHAIN_HEAD_CACHE_TIMEOUT', '2'))  # Seconds the latest block number is shared
+VOTE_VERIFICATION_BATCH_SIZE = int(os.getenv('VOTE_VERIFICATION_BATCH_SIZE', '500'))  # Receipts fetched per batch
+VOTE_VERIFICATION_GRACE = int(os.getenv('VOTE_VERIFICATION_GRACE', '600'))  # Seconds before a vote without a receipt is missing
+RECONCILIATION_REPORT_DIR = Path(os.getenv('RECONCILIATION_REPORT_DIR', BASE_DIR / 'reports'))  # JSON diff reports
+BLOCKCHAIN_ADMIN_PRIVATE_KEY = os.getenv('BLOCKCHAIN_ADMIN_PRIVATE_KEY', '')  # Signs whitelist sync transactions
+WHITELIST_SYNC_MAX_GAS = int(os.getenv('WHITELIST_SYNC_MAX_GAS', '15000000'))  # Gas per whitelistVoters transaction
+WHITELIST_SYNC_RETRIES = int(os.getenv('WHITELIST_SYNC_RETRIES', '3'))  # Resends of voters whose transaction failed
+WHITELIST_SYNC_RECEIPT_TIMEOUT = int(os.getenv('WHITELIST_SYNC_RECEIPT_TIMEOUT', '120'))  # Seconds to wait for each receipt
+RESULTS_PUSH_RATE = float(os.getenv('RESULTS_PUSH_RATE', '2'))  # Live results updates per second per election
+RESULTS_PUSH_KEEPALIVE = float(os.getenv('RESULTS_PUSH_KEEPALIVE', '15'))  # Seconds between keepalives on an idle stream
+RESULTS_PUSH_QUEUE_SIZE = int(os.getenv('RESULTS_PUSH_QUEUE_SIZE', '32'))  # Updates buffered per viewer before resyncing
+RESULTS_PUSH_MAX_AGE = float(os.getenv('RESULTS_PUSH_MAX_AGE', '5'))  # Seconds before the tallies are re-read regardless of the version
+VOTE_WRITE_BEHIND = os.getenv('VOTE_WRITE_BEHIND', '0') == '1'  # Batch the inserts of /api/votes/submit/
+VOTE_WRITE_BATCH_SIZE = int(os.getenv('VOTE_WRITE_BATCH_SIZE', '100'))  # Votes per batched insert
+VOTE_WRITE_BATCH_DELAY = float(os.getenv('VOTE_WRITE_BATCH_DELAY', '0.01'))  # Seconds a vote waits for its batch to fill
+ELECTION_METADATA_CACHE_SIZE = int(os.getenv('ELECTION_METADATA_CACHE_SIZE', '256'))  # Elections whose metadata each process keeps
+ELECTION_METADATA_CACHE_TTL = float(os.getenv('ELECTION_METADATA_CACHE_TTL', '5'))  # Seconds before metadata changed by another process is seen
+ELECTORAL_ROLL_CACHE_SIZE = int(os.getenv('ELECTORAL_ROLL_CACHE_SIZE', '64'))  # Electoral rolls each process keeps in memory
+ELECTORAL_ROLL_CACHE_TTL = float(os.getenv('ELECTORAL_ROLL_CACHE_TTL', '10'))  # Seconds before roll changes made by another process are seen
+ELECTORAL_ROLL_BLOOM_THRESHOLD = int(os.getenv('ELECTORAL_ROLL_BLOOM_THRESHOLD', '500000'))  # Larger rolls keep only a Bloom filter
+ELECTORAL_ROLL_BLOOM_ERROR_RATE = float(os.getenv('ELECTORAL_ROLL_BLOOM_ERROR_RATE', '0.01'))  # Share of absent students confirmed with a query
@@ -50,6 +50,19 @@ apiClient.interceptors.response.use(
 )
 
 const api = {
+  // Walk a cursor-paginated list endpoint one page at a time
+  async *pages(url, pageSize = 500) {
+    let next = url
+    let params = { page_size: pageSize }
+    while (next) {
+      const response = await apiClient.get(next, { params })
+      yield response.data.results
+      // The next link already carries the cursor and page size
+      next = response.data.next
+      params = undefined
+    }
+  },
+
   // Authentication
   register(userData) {
     console.log('Starting registration process...')
@@ -105,6 +118,11 @@ const api = {
   getElections() {
     return apiClient.get('/elections/')
   },
+
+  // Scalar fields and counts only, without positions or whitelists
+  getElectionSummaries() {
+    return apiClient.get('/elections/', { params: { view: 'summary' } })
+  },
   
   getElection(id) {
     return apiClient.get(`/elections/${id}/`)
@@ -253,6 +271,16 @@ const api = {
     return apiClient.delete(`/electoral-roll/${entryId}/`)
   },
 
+  // CSV file with student_id,first_name,last_name columns
+  bulkImportElectoralRoll(electionId, file) {
+    const formData = new FormData()
+    formData.append('election', electionId)
+    formData.append('file', file)
+    return apiClient.post('/electoral-roll/bulk-import/', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' }
+    })
+  },
+
   checkElectoralRoll(electionId, studentId) {
     if (!electionId || !studentId) {
       return Promise.resolve({ data: { isVerified: false } });
@@ -268,6 +296,13 @@ const api = {
     });
   },
 
+  checkElectoralRollBulk(electionId, studentIds) {
+    return apiClient.post('/electoral-roll/verify/bulk/', {
+      election_id: electionId,
+      student_ids: studentIds
+    });
+  },
+
   
   whitelistVoter(electionId, voterAddress) {
     return apiClient.post(`/elections/${electionId}/whitelist/`, { 
@@ -275,6 +310,20 @@ const api = {
     })
   },
 
+  whitelistVoters(electionId, { walletAddresses = [], studentIds = [] }) {
+    return apiClient.post(`/elections/${electionId}/whitelist/bulk/`, {
+      wallet_addresses: walletAddresses,
+      student_ids: studentIds
+    })
+  },
+
+  unwhitelistVoters(electionId, { walletAddresses = [], studentIds = [] }) {
+    return apiClient.post(`/elections/${electionId}/unwhitelist/bulk/`, {
+      wallet_addresses: walletAddresses,
+      student_ids: studentIds
+    })
+  },
+
   getVoterElectionWhitelist() {
     return apiClient.get('/voters/election_whitelist/');
   },
@@ -284,14 +333,39 @@ const api = {
     console.log("Payload sent to recordVote API:", voteData);
     return apiClient.post('/votes/', voteData)
   },
+
+  // Records every selection of a ballot at once: { election, wallet, transaction_hash, selections: [{ position, candidate }] }
+  recordBallot(ballot) {
+    return apiClient.post('/votes/ballot/', ballot)
+  },
   
   async getVotesByElection(electionId) {
     return apiClient.get(`/elections/${electionId}/votes/`) 
   },
+
+  votePages(electionId, pageSize) {
+    return this.pages(`/elections/${electionId}/votes/`, pageSize)
+  },
   
   // Results
   getResults(electionId) {
     return apiClient.get(`/elections/${electionId}/results/`)
+  },
+
+  // Results read from the election contract by the backend, as of the latest block
+  getChainResults(electionId) {
+    return apiClient.get(`/elections/${electionId}/chain-results/`)
+  },
+
+  // Live results pushed by the backend as server-sent events: a full `snapshot`,
+  // then `delta` events with the candidates whose count changed. EventSource
+  // cannot send headers, so the token goes in the query string.
+  streamResults(electionId, { onSnapshot, onDelta }) {
+    const token = encodeURIComponent(localStorage.getItem('token') || '')
+    const source = new EventSource(`${apiClient.defaults.baseURL}/elections/${electionId}/results/stream/?token=${token}`)
+    source.addEventListener('snapshot', event => onSnapshot(JSON.parse(event.data)))
+    source.addEventListener('delta', event => onDelta(JSON.parse(event.data)))
+    return source
   }
 }
 
@@ -562,33 +562,16 @@ export default createStore({
     },
     
     // Results actions
-    async fetchResults({ commit, state }, electionId) {
+    async fetchResults({ commit }, electionId) {
       try {
         commit('SET_LOADING', true)
         
-        // Find the election
-        // console.log(state.elections[0])
-        const election = state.elections.find(e => e.electionId === electionId)
-        // console.log(election.contractAddress)
-        if (!election || !election.contractAddress) {
-          throw new Error('Election not found or invalid')
-        }
-        
-        // Get the election contract
-        const electionContract = await web3Service.getElectionContract(
-            state.web3,
-            election.contractAddress
-          )
-        console.log("Election Contract received Successfully. ", electionContract)
-        commit('SET_CONTRACT', { name: election.contractAddress, contract: electionContract })
-        
-        // Get results from the contract
-        const contract = await web3Service.getElectionResults(electionContract)
-        if (contract)
-          console.log("Election result received from the contract successfully. ", contract)
+        // The backend reads the contract once per block for all viewers
+        const response = await api.getChainResults(electionId)
+        console.log("Election result received from the contract at block ", response.data.blockNumber)
 
         commit('SET_LOADING', false)
-        return results
+        return response.data.results
       } catch (error) {
         commit('SET_LOADING', false)
         commit('SET_ERROR', error.message || 'Failed to fetch results')